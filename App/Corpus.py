@@ -1,12 +1,19 @@
+import os
 import re
 import pickle
 import string
-import nltk
-from nltk.tokenize import *
-from nltk.stem.wordnet import WordNetLemmatizer
-from nltk.corpus import wordnet
+import threading
+from functools import partial
+from itertools import chain
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-from PyQt5.QtCore import QObject, pyqtSignal
+
+from storage import TextStore, PrefixIndex
+from corpus_format import CorpusFile, write_corpus, encode_records, append_records
+from stats import StatsEngine
+from rwlock import RWLock, reading, writing
+from search import BM25, parse_query, phrase_hits, near_hits
 
 # nltk.download('averaged_perceptron_tagger')
 # nltk.download('wordnet')
@@ -100,14 +107,15 @@ POS_TAGS = list(tag_descr.keys())
 
 
 def get_wordnet_pos(treebank_tag):
+    # Values of wordnet.ADJ, VERB, NOUN and ADV, so that WordNet is not loaded just for the constants
     if treebank_tag.startswith('J'):
-        return wordnet.ADJ
+        return 'a'
     elif treebank_tag.startswith('V'):
-        return wordnet.VERB
+        return 'v'
     elif treebank_tag.startswith('N'):
-        return wordnet.NOUN
+        return 'n'
     elif treebank_tag.startswith('R'):
-        return wordnet.ADV
+        return 'r'
     else:
         return ''
 
@@ -123,9 +131,232 @@ def preprocess_text(text):
     return text
 
 
-class Corpus(QObject):
+class LemmaCache:
+    """
+    Bounded LRU cache of WordNet lemmas keyed on (word, wordnet POS), with hit/miss counters.
+    It may be used from several threads, the lemmatizer is called outside of its lock.
+    """
+
+    def __init__(self, maxsize=200000):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.pending = None
+
+    def __len__(self):
+        self.load_pending()
+        return len(self.entries)
+
+    def defer(self, load):
+        """
+        Registers `load` returning (key, lemma) items, they are added on first use of the cache.
+        """
+        self.pending = load
+
+    def load_pending(self):
+        if self.pending is not None:
+            with self.lock:
+                load, self.pending = self.pending, None
+            if load is not None:
+                self.update(load())
+
+    def lemmatize(self, word, tag):
+        lemma = word
+        try:
+            self.load_pending()
+            wtag = get_wordnet_pos(tag)
+            if wtag != '':
+                key = (word, wtag)
+                with self.lock:
+                    cached = self.entries.get(key)
+                    if cached is not None:
+                        self.hits += 1
+                        self.entries.move_to_end(key)
+                        return cached
+                    self.misses += 1
+                lemma = get_lemmatizer().lemmatize(word, wtag)
+                self.put(key, lemma)
+        except Exception as e:
+            print(e)
+        return lemma
+
+    def put(self, key, lemma):
+        with self.lock:
+            self.entries[key] = lemma
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def update(self, items):
+        for key, lemma in items:
+            self.put(key, lemma)
+
+    def add_lemmas(self, lemmas):
+        """
+        Adds lemmas keyed by (word, treebank tag), e.g. the ones computed by analyze_text.
+        """
+        for (word, tag), lemma in lemmas.items():
+            wtag = get_wordnet_pos(tag)
+            if wtag != '':
+                self.put((word, wtag), lemma)
+
+    def items(self):
+        self.load_pending()
+        with self.lock:
+            return list(self.entries.items())
+
+    def cache_info(self):
+        return self.hits, self.misses, len(self)
+
+
+# NLTK models are loaded on first use (or by warm_up), importing this module does not import nltk
+_tagger = None
+_tokenizer = None
+_sent_tokenizer = None
+_lemmatizer = None
+_load_lock = threading.Lock()
+_lemma_cache = LemmaCache()
+
+
+def get_tagger():
+    """
+    Returns the perceptron tagger, loading it once per process
+    (nltk.pos_tag reloads the model on every call).
+    """
+    global _tagger
+    with _load_lock:
+        if _tagger is None:
+            from nltk.tag import PerceptronTagger
+            _tagger = PerceptronTagger()
+    return _tagger
+
+
+def get_tokenizer():
+    global _tokenizer
+    with _load_lock:
+        if _tokenizer is None:
+            from nltk.tokenize import TreebankWordTokenizer
+            _tokenizer = TreebankWordTokenizer()
+    return _tokenizer
+
+
+def get_sent_tokenizer():
+    global _sent_tokenizer
+    with _load_lock:
+        if _sent_tokenizer is None:
+            from nltk.tokenize import PunktSentenceTokenizer
+            _sent_tokenizer = PunktSentenceTokenizer()
+    return _sent_tokenizer
+
+
+def get_lemmatizer():
+    global _lemmatizer
+    with _load_lock:
+        if _lemmatizer is None:
+            from nltk.corpus import wordnet
+            from nltk.stem.wordnet import WordNetLemmatizer
+            # The lemmatizer loads WordNet on first use, which is not thread-safe, so it is loaded here
+            wordnet.ensure_loaded()
+            _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer
+
+
+def warm_up():
+    """
+    Loads the tokenizers, the tagger and WordNet, e.g. in a background thread while the UI starts.
+    """
+    try:
+        get_tokenizer()
+        get_sent_tokenizer()
+        get_tagger().tag(['warm', 'up'])
+        get_lemmatizer().lemmatize('warming', 'v')
+    except Exception as e:
+        print(e)
+
+
+def tag_sents(sents):
+    """
+    Tags a batch of tokenized sentences in one pass and returns a flat list of (word, tag) pairs.
+    """
+    tagger = get_tagger()
+    return list(chain.from_iterable(tagger.tag(tokens) for tokens in sents))
+
+
+def analyze_text(text, lemma_cache=None):
+    """
+    Tokenize, tag and lemmatize a single text without touching any corpus state,
+    so that it can be run in a worker process.
+    Returns (text, token starts relative to the text, (word, tag) pairs, lemmas by (word, tag)).
+    """
+    if lemma_cache is None:
+        lemma_cache = _lemma_cache
+    tokenizer = get_tokenizer()
+
+    text = preprocess_text(text)
+    sents = []
+    starts = []
+    for sent_start, sent_end in get_sent_tokenizer().span_tokenize(text):
+        sent = text[sent_start:sent_end]
+        sents.append(list(tokenizer.tokenize(sent)))
+        for s, _ in tokenizer.span_tokenize(sent):
+            starts.append(s + sent_start)
+
+    tokens_tags = tag_sents(sents)
+
+    lemmas = {}
+    for word, tag in tokens_tags:
+        if not Corpus.is_valid_word(word, tag):
+            continue
+        keys = [word, word.lower()] if word[0].isupper() else [word]
+        for key in keys:
+            if (key, tag) not in lemmas:
+                lemmas[(key, tag)] = lemma_cache.lemmatize(key, tag)
+    return text, starts, tokens_tags, lemmas
+
+
+def analyze_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return analyze_text(f.read())
+
+
+def init_worker(lemmas):
+    _lemma_cache.update(lemmas)
+
+
+def list_text_files(corpus_dir):
+    """
+    Returns sorted paths of all files under `corpus_dir` relative to it, skipping hidden directories.
+    """
+    files = []
+    for root, dirs, names in os.walk(corpus_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), corpus_dir).replace(os.sep, '/'))
+    return sorted(files)
+
+
+class Signal:
+    """
+    Qt-free counterpart of pyqtSignal: slots are called in the emitting thread.
+    """
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
 
-    status_sig = pyqtSignal(str)
+    def disconnect(self, slot):
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class Corpus:
 
     reg = r'[A-Za-z]+([\'|\-][A-Za-z]+)*'
     reg_find = r'(^|[^\w\-\'])({})([^\w\-\']|$)'
@@ -134,72 +365,279 @@ class Corpus(QObject):
     html_span = "<span style=\"white-space: pre;\">{}</span>"
     html_colored_span = "<span style=\"background-color:{};\">{}</span>"
 
+    inf_threshold = 1
+    # Saving to the corpus file rewrites it once its journal would exceed this fraction of the rest of it
+    journal_compact_ratio = 0.5
+
     def __init__(self):
-        super().__init__()
-        self.raw_text = ''
-        self.text_spans = {}
+        self.status_sig = Signal()
+        # Methods reading the corpus hold it for reading and methods changing it for writing, so any thread
+        # may call them; a caller holds it to make several calls atomic. Long reads work on snapshots.
+        self.lock = RWLock()
+        self.store = TextStore(self.sep, POS_TAGS)
         self.text_dicts = {}
         self.text_inf_dicts = {}
-        self.tokenized_text = []
+        self.word_texts = {}
+        self.lemma_forms = {}
+        self.prefix_index = PrefixIndex()
+        self.inf_dirty = set()
         self.freq_tag_dict = {}
-        self.tokenizer = TreebankWordTokenizer()
-        self.sent_tokenizer = PunktSentenceTokenizer()
-        self.lemmatizer = WordNetLemmatizer()
-        self.stats = ({}, {}, {})
+        self.lemma_cache = LemmaCache()
+        self.stats_engine = StatsEngine(self.reg, POS_TAGS)
+        self.stats = self.stats_engine.collect(self.store)
         self.refresh_stats = False
+        self.bm25 = BM25()
 
         self.modified_words = set()
-
+        # Words of the corpus dictionary whose frequency changed since the last pop_changed_words
+        self.changed_words = set()
+
+        # Changes since the corpus file `file_path` of `file_size` bytes (`base_size` without its journal)
+        # was loaded or saved; None if the corpus is not backed by a corpus file
+        self.journal = None
+        # The mapped CorpusFile texts, columns and dictionaries are read from, if it is still open
+        self.corpus_file = None
+        self.file_path = None
+        self.file_size = 0
+        self.base_size = 0
+
+    @property
+    def raw_text(self):
+        return self.store.raw
+
+    @property
+    def text_spans(self):
+        return self.store.spans
+
+    @property
+    def text_token_ranges(self):
+        return self.store.token_ranges
+
+    @property
+    def tokenized_text(self):
+        return self.store.tokens
+
+    @writing
     def load_from_pickle(self, pickle_file):
         with open(pickle_file, 'rb') as handle:
             data = pickle.load(handle)
-            (self.raw_text, self.text_spans, self.text_dicts, self.text_inf_dicts, self.tokenized_text,
-             self.freq_tag_dict, self.stats, self.refresh_stats) = data
+            (raw_text, text_spans, self.text_dicts, self.text_inf_dicts, tokenized_text,
+             self.freq_tag_dict, self.stats, self.refresh_stats) = data[:8]
+        # Corpora saved before the lemma cache was persisted have no 9th item
+        if len(data) > 8:
+            self.lemma_cache.update(data[8])
+        self.store = TextStore.from_legacy(self.sep, raw_text, text_spans, tokenized_text, POS_TAGS)
+        self.build_indexes()
+        self.journal = None
+        self.file_path = None
+        self.corpus_file = None
+
+    def build_indexes(self):
+        # word_texts, lemma_forms and prefix_index are built on first use,
+        # so that loading does not read every dictionary
+        self.word_texts = None
+        self.lemma_forms = None
+        self.prefix_index = None
+        self.inf_dirty = set()
+
+    def get_word_texts(self):
+        """
+        Returns word -> names of the texts containing it.
+        """
+        if self.word_texts is None:
+            # Readers build the lazy indexes concurrently, so an index is set only once it is complete
+            word_texts = {}
+            for text_name, d in self.text_dicts.items():
+                for word in d:
+                    word_texts.setdefault(word, set()).add(text_name)
+            self.word_texts = word_texts
+        return self.word_texts
+
+    def get_prefix_index(self):
+        """
+        Returns the PrefixIndex of the words of the corpus dictionary.
+        """
+        if self.prefix_index is None:
+            self.prefix_index = PrefixIndex(self.freq_tag_dict)
+        return self.prefix_index
+
+    def get_lemma_forms(self, lemma):
+        """
+        Returns the words of the corpus dictionary with `lemma` as the initial form of some of their tags.
+        Together with the word index of the store this is the lemma -> texts/positions index: it is kept
+        up to date as words are added, so matching lemmas never calls the lemmatizer for corpus words.
+        """
+        if self.lemma_forms is None:
+            lemma_forms = {}
+            for word, (_, tags) in self.freq_tag_dict.items():
+                for init in tags.values():
+                    if init:
+                        lemma_forms.setdefault(init.lower(), set()).add(word)
+            self.lemma_forms = lemma_forms
+        key = lemma.lower()
+        # Forms are not removed from lemma_forms when their tags are, so they are checked here
+        return [word for word in self.lemma_forms.get(key, ()) if word in self.freq_tag_dict
+                and any(init and init.lower() == key for init in self.freq_tag_dict[word][1].values())]
+
+    @writing
+    def load_from_file(self, path):
+        """
+        Opens a corpus file (see corpus_format), texts and dictionaries are read as they are accessed.
+        """
+        corpus_file = CorpusFile(path)
+        self.corpus_file = corpus_file
+        self.store = corpus_file.store
+        self.freq_tag_dict = corpus_file.read_dict(0)
+        self.text_dicts = corpus_file.text_dicts()
+        self.text_inf_dicts = corpus_file.text_inf_dicts()
+        # Stats are not stored, they are recomputed from the token columns when requested
+        self.stats = self.stats_engine.collect(TextStore(self.sep, POS_TAGS))
+        self.refresh_stats = True
+        self.lemma_cache.defer(corpus_file.lemma_items)
+        self.build_indexes()
+        self.journal = None
+        failed = 0
+        texts_added = False
+        for i, record in enumerate(corpus_file.read_journal()):
+            try:
+                self.replay(record)
+            except Exception as e:
+                failed += 1
+                print(f'Journal record {i} ({record[0]}) of {path} was not applied: {e!r}')
+            else:
+                texts_added = texts_added or record[0] == 'text'
+        if texts_added:
+            self.update_inf_dicts()
+        if failed:
+            self.status_sig.emit(f'{failed} changes of "{os.path.basename(path)}" could not be applied')
+        self.journal = []
+        self.file_path = os.path.abspath(path)
+        # A journal that does not replay is not appended to, the next save rewrites the file from the corpus
+        self.file_size = corpus_file.end if not failed else None
+        self.base_size = corpus_file.base_size
+
+    @writing
+    def save_to_file(self, path, compact=False):
+        """
+        Appends the changes made since the last load or save to the journal of the corpus file,
+        so that saving costs time proportional to the changes. Other files, and the corpus file
+        when `compact` is set or its journal grows too large, are written in full.
+        """
+        path = os.path.abspath(path)
+        if not compact and self.journal is not None and path == self.file_path \
+                and os.path.exists(path) and os.path.getsize(path) == self.file_size:
+            data = encode_records(self.journal)
+            if self.file_size + len(data) - self.base_size <= self.journal_compact_ratio * self.base_size:
+                append_records(path, data)
+                self.file_size += len(data)
+                self.journal = []
+                return
+        self.update_inf_dicts()
+        # A mapped file cannot be replaced on Windows; a full rewrite reads nearly all of it anyway
+        self.release_file()
+        write_corpus(path, self.store, self.freq_tag_dict, self.text_dicts, self.text_inf_dicts,
+                     self.lemma_cache.items())
+        self.journal = []
+        self.file_path = path
+        self.file_size = self.base_size = os.path.getsize(path)
+
+    @writing
+    def release_file(self):
+        """
+        Loads everything still read lazily from the corpus file into memory and unmaps the file.
+        """
+        if self.corpus_file is None:
+            return
+        for segment in self.store.segments:
+            segment.load()
+        self.text_dicts = dict(self.text_dicts)
+        self.text_inf_dicts = dict(self.text_inf_dicts)
+        self.lemma_cache.load_pending()
+        self.corpus_file.close()
+        self.corpus_file = None
+
+    def log(self, *record):
+        if self.journal is not None:
+            self.journal.append(record)
+
+    def replay(self, record):
+        """
+        Applies a journal record logged by `log`, raises if it cannot be applied.
+        """
+        op, args = record[0], record[1:]
+        if op == 'text':
+            text_name, text, starts, words, tags, lemmas = args
+            self.add_analyzed_text((text, starts, list(zip(words, tags)),
+                                    {(word, tag): lemma for word, tag, lemma in lemmas}), text_name)
+        elif op == 'word':
+            index, new_word, starts, words, tags = args
+            self.replace_word(index, new_word, (starts, list(zip(words, tags))))
+        elif op == 'tag':
+            self.replace_tag(*args)
+        elif op == 'add_tag':
+            self.add_tag(*args)
+        elif op == 'remove_tag':
+            self.remove_tag(*args)
+        else:
+            raise ValueError(f'unknown journal record {op!r}')
 
+    @writing
     def save_to_pickle(self, pickle_file):
+        self.update_inf_dicts()
         with open(pickle_file, 'wb') as handle:
-            data = (self.raw_text, self.text_spans, self.text_dicts, self.text_inf_dicts, self.tokenized_text,
-                    self.freq_tag_dict, self.stats, self.refresh_stats)
+            data = (str(self.raw_text), dict(self.text_spans), dict(self.text_dicts), dict(self.text_inf_dicts),
+                    list(self.tokenized_text), self.freq_tag_dict, self.stats, self.refresh_stats,
+                    self.lemma_cache.items())
             pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
 
-    def is_valid_word(self, word, tag):
-        return tag in POS_TAGS and re.fullmatch(self.reg, word)
+    @classmethod
+    def is_valid_word(cls, word, tag):
+        return tag in POS_TAGS and re.fullmatch(cls.reg, word)
 
     def add_text(self, text, text_name='New text'):
-
         self.status_sig.emit(f'Adding "{text_name}" ...')
         try:
-            print('Preprocessing...')
-            text = preprocess_text(text)
-            prev_len = len(self.raw_text)+len(self.sep)
-            self.raw_text += self.sep + text
+            print('Analyzing...')
+            analysis = analyze_text(text, self.lemma_cache)
+        except Exception as e:
+            print(e)
+            return
+        # Only merging the analysis changes the corpus, it can be read while the text is analyzed
+        with self.lock.write():
+            self.add_analyzed_text(analysis, text_name)
+            self.update_inf_dicts()
+
+    def add_files(self, files, processes=None):
+        """
+        Add texts from (path, text_name) pairs, analyzing them in a pool of `processes` workers.
+        Results are merged in the given order, so the corpus is the same as after sequential loading;
+        the lock is held only while a text is merged.
+        """
+        files = list(files)
+        with ProcessPoolExecutor(processes, initializer=init_worker, initargs=(self.lemma_cache.items(),)) as pool:
+            analyses = pool.map(analyze_file, [path for path, _ in files])
+            for i, ((_, text_name), analysis) in enumerate(zip(files, analyses)):
+                self.status_sig.emit(f'Adding "{text_name}" ({i+1}/{len(files)}) ...')
+                self.add_analyzed_text(analysis, text_name)
+        self.update_inf_dicts()
+
+    @writing
+    def add_analyzed_text(self, analysis, text_name='New text'):
+        try:
+            text, starts, tokens_tags, lemmas = analysis
+            self.lemma_cache.add_lemmas(lemmas)
 
             default_name = text_name + ' ({})'
             count = 0
             while text_name in self.text_spans:
                 count += 1
                 text_name = default_name.format(count)
-            self.text_spans[text_name] = (prev_len, prev_len + len(text))
-
-            print('Tokenizing...')
-            sent_spans = list(self.sent_tokenizer.span_tokenize(text))
-            sents = []
-            spans_starts = []
-            for sent_start, sent_end in sent_spans:
-                sent = text[sent_start:sent_end]
-                tokens_sent = list(self.tokenizer.tokenize(sent))
-                sents.append(tokens_sent)
-                spans_sent = list(self.tokenizer.span_tokenize(sent))
-                for i in range(len(spans_sent)):
-                    s, e = spans_sent[i]
-                    spans_starts.append(s+prev_len+sent_start)
-
-            print('Making POS tags...')
-            tokens_tags = []
-            for tokens in sents:
-                tokens_tags += nltk.pos_tag(tokens)
-            spans_tokens_tags = [(spans_starts[i], *tokens_tags[i]) for i in range(len(spans_starts))]
-            self.tokenized_text += spans_tokens_tags
+            prev_tag = self.stats_engine.counted_tag(self.store, self.store.num_tokens - 1, -1)
+            words, tags = [w for w, _ in tokens_tags], [t for _, t in tokens_tags]
+            self.store.add(text_name, text, starts, words, tags)
+            self.log('text', text_name, text, list(starts), words, tags,
+                     [(word, tag, lemma) for (word, tag), lemma in lemmas.items()])
+            self.stats_engine.update(self.stats, [], tokens_tags, prev_tag)
 
             print('Filling dictionary...')
 
@@ -208,53 +646,99 @@ class Corpus(QObject):
             words_tags.sort(reverse=True, key=lambda wt: wt[0])
             self.text_dicts[text_name] = {}
             for word, tag in words_tags:
-                self.add_word(word, tag)
-                self.add_word(word, tag, text_name)
-
-            for text_name in self.text_dicts:
-                self.text_inf_dicts[text_name] = self.get_inf_dict(text_name)
+                self.add_word(word, tag, lemmas=lemmas)
+                self.add_word(word, tag, text_name, lemmas=lemmas)
+            self.inf_dirty.add(text_name)
             print('Done!')
 
         except Exception as e:
             print(e)
 
-    def get_words(self, text_name=None, reset_modified=True):
-        d = self.freq_tag_dict
+    @reading
+    def get_words(self, text_name=None):
+        """
+        Returns (words of the corpus dictionary or of a text sorted case-insensitively,
+        a copy of the words added since the last pop_modified_words).
+        """
         if text_name:
-            d = self.text_dicts[text_name]
-
-        words = list(d.keys())
-        words.sort(key=lambda w: w.lower())
+            words = list(self.text_dicts[text_name].keys())
+            words.sort(key=lambda w: w.lower())
+        else:
+            words = self.get_prefix_index().words()
+        return words, set(self.modified_words)
+
+    @reading
+    def find_words(self, prefix, ignore_case=True, limit=None):
+        """
+        Returns at most `limit` (all if None) words of the corpus dictionary starting with `prefix`,
+        in the order of get_words.
+        """
+        return self.get_prefix_index().find(prefix, ignore_case, limit)
+
+    @reading
+    def pop_changed_words(self):
+        """
+        Returns the words added, removed or recounted since the last call.
+        """
+        # Words are added to the set only by writers, so reading is enough to take it
+        changed = self.changed_words
+        self.changed_words = set()
+        return changed
+
+    @reading
+    def pop_changed_freqs(self):
+        """
+        Returns {word: frequency} of the words added, removed (frequency 0) or recounted since the last
+        pop_changed_words.
+        """
+        return {word: self.get_freq(word) for word in self.pop_changed_words()}
+
+    @reading
+    def pop_modified_words(self):
+        """
+        Returns the words added since the last call.
+        """
         modified = self.modified_words
-        if reset_modified:
-            self.modified_words = set()
-        return words, modified
+        self.modified_words = set()
+        return modified
+
+    @reading
+    def count_occurrences(self, word, text_name=None):
+        texts = self.store.get_occurrences(word)
+        if text_name:
+            return len(texts.get(text_name, ()))
+        return sum(len(positions) for positions in texts.values())
 
+    @reading
     def find_index(self, word, num, text_name=None):
-        count = 0
-        wl = word.lower()
+        if num < 0:
+            return None
+        texts = self.store.get_occurrences(word)
         if text_name:
-            text_start, text_end = self.text_spans[text_name]
-        for i, (s, w, _) in enumerate(self.tokenized_text):
-            if text_name and (s < text_start or s >= text_end):
-                continue
-            if w.lower() == wl:
-                if count == num:
-                    return i
-                count += 1
+            texts = {text_name: texts.get(text_name, ())}
+        for text_name, positions in texts.items():
+            if num < len(positions):
+                return self.text_token_ranges[text_name][0] + positions[num]
+            num -= len(positions)
         return None
 
+    @reading
+    def get_token_range(self, text_name):
+        """
+        Returns the range of token indices [first, last) of a text.
+        """
+        return self.text_token_ranges[text_name]
+
+    @reading
     def find_word_by_raw_index(self, text_name, index):
-        text_start, text_end = self.text_spans[text_name]
-        index += text_start
-        for i, (start, word, tag) in enumerate(self.tokenized_text):
-            end = start + len(word)
-            if start <= index < end:
+        token = self.store.token_at(text_name, index)
+        if token is not None:
+            i, start, word, tag = token
+            if start <= index < start + len(word):
                 return i, word, tag if tag in POS_TAGS else 'OTHER'
-            elif start > index:
-                break
         return None, None, None
 
+    @reading
     def get_word_context(self, word, num=0):
         index = self.find_index(word, num)
         word_start, word, tag = self.tokenized_text[index]
@@ -273,168 +757,248 @@ class Corpus(QObject):
         ]
         return "".join(context)
 
-    def add_word(self, word, tag, text_name=None):
+    def add_word(self, word, tag, text_name=None, lemmas=None):
         d = self.freq_tag_dict
         if text_name:
             d = self.text_dicts[text_name]
-        self.refresh_stats = True
         self.modified_words.add(word)
         if word[0].isupper():
             lower_word = word.lower()
             lower_val = d.get(lower_word, [0, None])[0]
             if lower_val > 0:
                 d[lower_word][0] += 1
+                self.on_freq_change(lower_word, lower_val, lower_val + 1, text_name)
                 if d[lower_word][1].get(tag) is None:
-                    init = self.get_init_form(lower_word, tag, text_name)
+                    init = self.get_init_form(lower_word, tag, text_name, lemmas)
                     d[lower_word][1][tag] = init
+                    self.on_init_form(lower_word, init, text_name)
                 return
         val = d.get(word, [0, None])[0]
         if val > 0:
             d[word][0] += 1
             if d[word][1].get(tag) is None:
-                init = self.get_init_form(word, tag, text_name)
+                init = self.get_init_form(word, tag, text_name, lemmas)
                 d[word][1][tag] = init
+                self.on_init_form(word, init, text_name)
         else:
-            init = self.get_init_form(word, tag, text_name)
+            init = self.get_init_form(word, tag, text_name, lemmas)
             d[word] = [1, {tag: init}]
+            self.on_init_form(word, init, text_name)
+        self.on_freq_change(word, val, val + 1, text_name)
 
-    def add_tag(self, word, tag, text_name=None):
+    def on_init_form(self, word, init, text_name=None):
+        if not text_name and init and self.lemma_forms is not None:
+            self.lemma_forms.setdefault(init.lower(), set()).add(word)
+
+    def on_freq_change(self, word, old_freq, new_freq, text_name=None):
+        if text_name:
+            if old_freq == 0 and self.word_texts is not None:
+                self.word_texts.setdefault(word, set()).add(text_name)
+            return
+        self.changed_words.add(word)
+        if self.prefix_index is not None:
+            if old_freq == 0:
+                self.prefix_index.add(word)
+            elif new_freq == 0:
+                self.prefix_index.remove(word)
+        if (old_freq > self.inf_threshold) != (new_freq > self.inf_threshold):
+            # The word became (non-)informative, texts containing it have to be reweighted
+            self.inf_dirty.update(self.get_word_texts().get(word, ()))
+
+    @writing
+    def add_tag(self, word, tag, text_name=None, log=True):
         d = self.freq_tag_dict
         if text_name:
             d = self.text_dicts[text_name]
-        if d[word][1].get(tag) is None:
+        # Edits are logged once they are known to apply, so that the journal replays
+        tags = d[word][1]
+        if log:
+            self.log('add_tag', word, tag, text_name)
+        if tags.get(tag) is None:
             init = self.get_init_form(word, tag, text_name)
-            d[word][1][tag] = init
-
-    def remove_tag(self, word, tag):
-        del self.freq_tag_dict[word][1][tag]
-
+            tags[tag] = init
+            self.on_init_form(word, init, text_name)
+
+    @writing
+    def remove_tag(self, word, tag, log=True):
+        tags = self.freq_tag_dict[word][1]
+        if tag not in tags:
+            raise KeyError(tag)
+        if log:
+            self.log('remove_tag', word, tag)
+        del tags[tag]
+
+    @writing
     def replace_tag(self, index, new_tag):
         old_start, old_word, old_tag = self.tokenized_text[index]
-        self.tokenized_text[index] = (old_start, old_word, new_tag)
-        self.remove_tag(old_word, old_tag)
-        self.add_tag(old_word, new_tag)
-
-    def replace_word(self, index, new_word):
+        if old_tag not in self.freq_tag_dict[old_word][1]:
+            raise KeyError(old_tag)
+        self.log('tag', index, new_tag)
+        self.store.set_tag(index, new_tag)
+        self.stats_engine.update(self.stats, [(old_word, old_tag)], [(old_word, new_tag)],
+                                 self.stats_engine.counted_tag(self.store, index - 1, -1),
+                                 self.stats_engine.counted_tag(self.store, index + 1, 1))
+        self.remove_tag(old_word, old_tag, log=False)
+        self.add_tag(old_word, new_tag, log=False)
+
+    @writing
+    def replace_word(self, index, new_word, analysis=None):
+        """
+        Replaces token `index` with `new_word`, which is tokenized and tagged
+        unless `analysis` gives (token starts relative to `new_word`, [(token, tag)]).
+        """
         old_start, old_word, old_tag = self.tokenized_text[index]
-        l_old = len(old_word)
-        l_new = len(new_word)
-        delta = l_new - l_old
-
-        # Replace in raw text
-        new_text = self.raw_text[:old_start] + new_word + self.raw_text[old_start + l_old:]
-        self.raw_text = new_text
-        for text_name, (text_start, text_end) in self.text_spans.items():
-            if text_start <= old_start < text_end:
-                self.text_spans[text_name] = (text_start, text_end + delta)
-            if old_start < text_start:
-                self.text_spans[text_name] = (text_start + delta, text_end + delta)
-
-        # Pop from dict
         old = old_word
         if old_word not in self.freq_tag_dict:
             old = old_word.lower()
-        if self.freq_tag_dict[old][0] == 1:
+        old_freq = self.freq_tag_dict[old][0]
+        if analysis is None:
+            new_spans = list(get_tokenizer().span_tokenize(new_word))
+            new_starts = [s for s, _ in new_spans]
+            new_tokens_tags = get_tagger().tag([new_word[s:t] for s, t in new_spans])
+        else:
+            new_starts, new_tokens_tags = analysis
+        new_words, new_tags = [w for w, _ in new_tokens_tags], [t for _, t in new_tokens_tags]
+        prev_tag = self.stats_engine.counted_tag(self.store, index - 1, -1)
+        next_tag = self.stats_engine.counted_tag(self.store, index + 1, 1)
+        self.log('word', index, new_word, new_starts, new_words, new_tags)
+
+        # Pop from dict
+        if old_freq == 1:
             self.freq_tag_dict.pop(old)
         else:
             self.freq_tag_dict[old][0] -= 1
+        self.on_freq_change(old, old_freq, old_freq - 1)
 
-        # Replace in tokenized text
-        new_tokenized_text = self.tokenized_text[:index]
-
-        new_spans = list(self.tokenizer.span_tokenize(new_word))
-        new_tokens = []
-        for s, t in new_spans:
-            new_tokens.append(new_word[s:t])
-        new_tokens_tags = nltk.pos_tag(new_tokens)
-        for i in range(len(new_spans)):
-            word, tag = new_tokens_tags[i]
-            new_tokenized_text.append((new_spans[i][0]+old_start, word, tag))
+        # Replace in text store
+        for word, tag in new_tokens_tags:
             if self.is_valid_word(word, tag):
                 self.add_word(word, tag)
-
-        for i in range(index+1, len(self.tokenized_text)):
-            s, word, tag = self.tokenized_text[i]
-            new_tokenized_text.append((s+delta, word, tag))
-
-        self.tokenized_text = new_tokenized_text
+        self.store.replace_token(index, new_word, new_starts, new_words, new_tags)
+        self.stats_engine.update(self.stats, [(old_word, old_tag)], new_tokens_tags, prev_tag, next_tag)
 
     def collect_stats(self):
-        if self.refresh_stats:
-            tag_freq = {tag: 0 for tag in POS_TAGS}
-            word_tag_freq = {}
-            tag_tag_freq = {}
-            prev_wt = None
-            for s, w, t in self.tokenized_text:
-                if t not in POS_TAGS or re.fullmatch(self.reg, w) is None:
-                    continue
-                tag_freq[t] += 1
-                wt = (w.lower(), t)
-                if word_tag_freq.get(wt):
-                    word_tag_freq[wt] += 1
-                else:
-                    word_tag_freq[wt] = 1
-                if prev_wt:
-                    tag_pair = (prev_wt[1], t)
-                    if tag_tag_freq.get(tag_pair):
-                        tag_tag_freq[tag_pair] += 1
-                    else:
-                        tag_tag_freq[tag_pair] = 1
-                prev_wt = wt
-            self.stats = tag_freq, word_tag_freq, tag_tag_freq
-            self.refresh_stats = False
-        return self.stats
-
-    def get_annotated_text(self, text_name):
-        annotated_text = []
+        """
+        Returns copies of (tag freq, word-tag freq, tag-tag freq). They are updated incrementally on every change,
+        only stats of corpora saved with `refresh_stats` set are recomputed, from a snapshot of the store
+        so that the corpus can be changed meanwhile.
+        """
+        with self.lock.read():
+            if not self.refresh_stats:
+                return tuple(dict(freq) for freq in self.stats)
+            source, store = self.store, self.store.snapshot()
+        stats = self.stats_engine.collect(store)
+        with self.lock.write():
+            if self.refresh_stats:
+                if self.store is not source or self.store.version != store.version:
+                    stats = self.stats_engine.collect(self.store)
+                self.stats = stats
+                self.refresh_stats = False
+            return tuple(dict(freq) for freq in self.stats)
+
+    def iter_annotated_text(self, text_name, chunk_size=2000):
+        """
+        Yields the text as HTML with words colored by their tags, in chunks of about `chunk_size` tokens
+        ending at line breaks (or of 2 * `chunk_size` tokens if there are none), so that a view can
+        show the beginning of a long text before the rest of it is rendered.
+        Chunks are read from a snapshot of the store, the corpus may be changed while they are consumed.
+        """
+        with self.lock.read():
+            store = self.store.snapshot()
         colored_text = []
-        text_start, text_end = self.text_spans[text_name]
-        prev_e = text_start
-        for s, w, t in self.tokenized_text:
-            if text_start > s:
-                continue
-            if s >= text_end:
-                break
+        num_tokens = 0
+        text = store.segment(text_name).text
+        prev_e = 0
+        for s, w, t in store.iter_text_tokens(text_name):
             w = "\"" if w == "``" or w == "''" else w
             e = s+len(w)
-            trash = self.raw_text[prev_e:s]
-            word = self.raw_text[s:e]
-            if t in POS_TAGS and w not in string.punctuation:
-                tag = t
-            else:
-                tag = 'OTHER'
-            annotated_text.append((trash, word, tag))
+            trash = text[prev_e:s]
+            if num_tokens >= chunk_size and ('\n' in trash or num_tokens >= 2 * chunk_size):
+                yield ''.join(colored_text)
+                colored_text = []
+                num_tokens = 0
+            word = text[s:e]
+            tag = self.color_tag(w, t)
             colored_text.append(self.html_span.format(trash))
             color = get_color(tag)
             colored_text.append(self.html_colored_span.format(color, word))
+            num_tokens += 1
             prev_e = e
+        if colored_text:
+            yield ''.join(colored_text)
 
-        return ''.join(colored_text)
+    def get_annotated_text(self, text_name):
+        return ''.join(self.iter_annotated_text(text_name))
 
+    @staticmethod
+    def color_tag(word, tag):
+        """
+        Returns the tag a token is colored by, OTHER for punctuation and tags without a color.
+        """
+        return tag if tag in POS_TAGS and word not in string.punctuation else 'OTHER'
+
+    @reading
+    def get_token_tags(self, text_name, start=0, end=None):
+        """
+        Returns [(start, length, tag to color by)] of the tokens of a text starting in [start, end)
+        relative to the text, e.g. of a block of a document showing the text.
+        """
+        return self.read_token_tags(self.store, text_name, start, end)
+
+    def get_token_source(self, text_name):
+        """
+        Returns get_token_tags of a text as a function of (start, end) that reads a snapshot of the store
+        instead of holding the lock, so a highlighter running in the GUI thread never waits for a writer;
+        it gives the tokens as of this call.
+        """
+        with self.lock.read():
+            store = self.store.snapshot()
+        return partial(self.read_token_tags, store, text_name)
+
+    @classmethod
+    def read_token_tags(cls, store, text_name, start=0, end=None):
+        tokens = []
+        for s, w, t in store.iter_text_tokens(text_name, start, end):
+            w = "\"" if w == "``" or w == "''" else w
+            tokens.append((s, len(w), cls.color_tag(w, t)))
+        return tokens
+
+    @reading
+    def get_highlighted_tokens(self, text_name, keywords=None, lemmatize=True, hits=None):
+        """
+        Returns [(start, length, tag to color by)] of the tokens of a text get_raw_text highlights.
+        """
+        lower_ids = set().union(*(self.get_keyword_ids(keyword, lemmatize) for keyword in keywords or ()))
+        positions = chain.from_iterable(hits or ())
+        return [(s, len(w), self.color_tag(w, t))
+                for s, w, t in self.store.find_text_tokens(text_name, lower_ids, positions)]
+
+    @reading
     def get_text_names(self):
         return list(self.text_spans.keys())
 
-    def get_raw_text(self, text_name, keywords=None):
-        text_start, text_end = self.text_spans[text_name]
-        raw_text = self.raw_text[text_start:text_end]
-        prev_end = text_start
-        if keywords:
+    @reading
+    def get_raw_text(self, text_name, keywords=None, lemmatize=True, hits=None):
+        """
+        Returns the text, as HTML with highlighted occurrences of `keywords` (matched like query keywords,
+        see get_keyword_ids) and tokens of `hits` (token positions in the text) if they are given.
+        """
+        raw_text = self.store.segment(text_name).text
+        prev_end = 0
+        if keywords or hits:
             new_text = []
-            for word_start, word, tag in self.tokenized_text:
-                if word_start < text_start or word_start >= text_end:
-                    continue
-                init_word = self.get_init_form(word, tag, text_name)
-                if word in keywords or word.lower() in keywords or init_word in keywords:
-                    raw_span = self.html_span.format(self.raw_text[prev_end:word_start])
-                    prev_end = word_start + len(word)
-                    new_text.append(raw_span)
-                    span = self.html_colored_span.format(get_color(tag), word)
-                    new_text.append(span)
-            raw_span = self.html_span.format(self.raw_text[prev_end:])
+            for word_start, length, tag in self.get_highlighted_tokens(text_name, keywords, lemmatize, hits):
+                raw_span = self.html_span.format(raw_text[prev_end:word_start])
+                prev_end = word_start + length
+                new_text.append(raw_span)
+                span = self.html_colored_span.format(get_color(tag), raw_text[word_start:prev_end])
+                new_text.append(span)
+            raw_span = self.html_span.format(raw_text[prev_end:])
             new_text.append(raw_span)
             raw_text = ''.join(new_text)
         return raw_text
 
+    @reading
     def get_word_bounds(self, text_name, index):
         text_start, _ = self.text_spans[text_name]
         start, word, _ = self.tokenized_text[index]
@@ -442,77 +1006,116 @@ class Corpus(QObject):
         return start - text_start, end - text_start
 
     def get_freq(self, word, text_name=None):
+        # Not locked, as it is called for every word of a word table; callers hold the lock
         d = self.freq_tag_dict
         if text_name:
             d = self.text_dicts[text_name]
         return d.get(word, (0, {}))[0]
 
+    @reading
     def get_tags(self, word, text_name=None):
         d = self.freq_tag_dict
         if text_name:
             d = self.text_dicts[text_name]
-        return d.get(word, (0, {}))[1].keys()
+        return list(d.get(word, (0, {}))[1].keys())
 
     @staticmethod
     def make_tag(word):
         tag = ''
         try:
-            _, tag = nltk.pos_tag([word])[0]
+            _, tag = get_tagger().tag([word])[0]
         except Exception as e:
             print(e)
         return tag
 
-    def get_init_form(self, word, tag, text_name=None):
+    @reading
+    def get_init_form(self, word, tag, text_name=None, lemmas=None):
         d = self.freq_tag_dict
         if text_name:
             d = self.text_dicts[text_name]
         if d.get(word) is not None and d[word][1].get(tag) is not None:
             return d[word][1][tag]
-        lemma = word
-        try:
-            wtag = get_wordnet_pos(tag)
-            if wtag != '':
-                lemma = self.lemmatizer.lemmatize(word, wtag)
-        except Exception as e:
-            print(e)
-        return lemma
+        if lemmas is not None and (word, tag) in lemmas:
+            return lemmas[(word, tag)]
+        return self.lemma_cache.lemmatize(word, tag)
 
     def get_inf_dict(self, text_name, threshold=1):
-        inf_words = [
-            word for word in self.get_words(reset_modified=False)[0]
-            if self.get_freq(word) > threshold
-        ]
         d = self.text_dicts[text_name]
         inf_d = {}
         max_freq = 0
         for word, (freq, _) in d.items():
-            if word in inf_words:
-                inf_d[word] = d[word][0]
+            if self.get_freq(word) > threshold:
+                inf_d[word] = freq
                 if max_freq < freq:
                     max_freq = freq
         for word in inf_d:
             inf_d[word] /= max_freq
         return inf_d
 
-    def query(self, phrase):
-        tokens = self.tokenizer.tokenize(phrase)
-        tokens_tags = nltk.pos_tag(tokens)
+    @writing
+    def update_inf_dicts(self):
+        """
+        Recomputes informative word weights only for the texts affected since the last update
+        (added texts and texts containing words whose corpus frequency crossed the threshold).
+        """
+        for text_name in self.inf_dirty:
+            self.text_inf_dicts[text_name] = self.get_inf_dict(text_name, self.inf_threshold)
+        self.inf_dirty = set()
+
+    def get_keyword_ids(self, keyword, lemmatize=True):
+        """
+        Returns lowercased word ids of the words matched by a keyword: its case forms and,
+        if `lemmatize` is set, the words whose initial form it is.
+        """
+        ids = self.store.vocab.ids
+        words = [keyword] + (self.get_lemma_forms(keyword) if lemmatize else [])
+        return {ids[word.lower()] for word in words if word.lower() in ids}
+
+    @reading
+    def query(self, phrase, top_k=None, lemmatize=True):
+        """
+        Ranks texts by BM25 relevance to the words of `phrase`. With `lemmatize` a keyword is matched
+        by its lemma, i.e. by all forms of it, otherwise by its case forms only.
+        Quoted parts of `phrase` match exact sequences of words (by case forms) and `a NEAR/k b` matches
+        a and b (as keywords) at most k tokens apart; texts have to contain all such clauses.
+        Returns ({text name: score} of the `top_k` (all if None) matching texts best first, keywords,
+        {text name: [token positions in the text of each phrase or NEAR hit]});
+        get_raw_text highlights the keywords as they were matched and the hits.
+        """
+        free_text, phrases, nears = parse_query(phrase)
+        tokens = get_tokenizer().tokenize(free_text)
+        tokens_tags = get_tagger().tag(tokens) if tokens else []
         keywords = []
+        terms = set()
         for token, tag in tokens_tags:
             if self.is_valid_word(token, tag) and tag not in non_inf_tags:
-                # init = self.get_init_form(token, tag)
-                keywords.append(token)
-
-        relevant_texts = {}
-        for text_name in self.text_spans:
-            inf_d = self.text_inf_dicts[text_name]
-            p = 0
-            for word in inf_d:
-                if word in keywords:
-                    p += inf_d[word]
-
-            if p > 0:
-                relevant_texts[text_name] = p
-
-        return relevant_texts, keywords
-
+                words = [token]
+                if lemmatize:
+                    lemma = self.get_init_form(token, tag)
+                    if lemma and lemma.lower() != token.lower():
+                        words.append(lemma)
+                keywords += [word for word in words if word not in keywords]
+                lower_ids = frozenset().union(*(self.get_keyword_ids(word, lemmatize) for word in words))
+                if lower_ids:
+                    terms.add(lower_ids)
+
+        clause_hits = []
+        for words in phrases:
+            word_terms = [frozenset(self.get_keyword_ids(word, False)) for word in get_tokenizer().tokenize(words)]
+            clause_hits.append(phrase_hits(self.store, word_terms))
+            terms.update(lower_ids for lower_ids in word_terms if lower_ids)
+        for first, k, second in nears:
+            first, second = frozenset(self.get_keyword_ids(first, lemmatize)), \
+                frozenset(self.get_keyword_ids(second, lemmatize))
+            clause_hits.append(near_hits(self.store, first, second, k))
+            terms.update(lower_ids for lower_ids in (first, second) if lower_ids)
+
+        texts = None
+        if clause_hits:
+            texts = set.intersection(*(set(text_hits) for text_hits in clause_hits))
+        relevant_texts = dict(self.bm25.top_k(self.store, terms, top_k, texts))
+        hits = {}
+        for text_hits in clause_hits:
+            for text_name in relevant_texts:
+                hits.setdefault(text_name, []).extend(text_hits[text_name])
+        return relevant_texts, keywords, hits
@@ -1,47 +1,77 @@
 import os
-import nltk
-from nltk.corpus.reader.plaintext import *
 import sys
 import math
+import threading
+from functools import partial
 from PyQt5 import uic
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 
 from Corpus import *
+from corpus_format import is_corpus_file
+from models import WordFreqModel, StatsModel
+from highlighter import TagHighlighter
+from tasks import TaskExecutor
 from td import TagsDescriptionDialog
 
 qtCreatorFile = "app_window.ui"
 
-Ui_MainWindow, QtBaseClass = uic.loadUiType(qtCreatorFile)
+# Precompiled with `pyuic5 app_window.ui -o ui_app_window.py`, the .ui file is compiled at runtime only as a fallback
+try:
+    from ui_app_window import Ui_MainWindow
+except ImportError:
+    Ui_MainWindow, QtBaseClass = uic.loadUiType(qtCreatorFile)
 
 
 class CorpusLoadTask(QThread):
     done = pyqtSignal()
     busy_sig = pyqtSignal(bool)
+    # Corpus status messages, delivered to the GUI thread
+    status_sig = pyqtSignal(str)
 
-    def __init__(self, corpus_dir, corpus):
+    def __init__(self, corpus_dir, corpus, processes=None):
         super(CorpusLoadTask, self).__init__()
         self.corpus_dir = corpus_dir
         self.corpus = corpus
+        self.processes = processes
 
     def run(self):
         self.busy_sig.emit(True)
-        corpus_reader = PlaintextCorpusReader(self.corpus_dir, '.*')
-        files = corpus_reader.fileids()
+        emit_status = self.status_sig.emit
+        self.corpus.status_sig.connect(emit_status)
+        files = list_text_files(self.corpus_dir)
         try:
-            for file in files:
-                with open(os.path.join(self.corpus_dir, file), 'r', encoding='utf-8') as f:
-                    text = f.read()
-                self.corpus.add_text(text, file)
+            if self.processes == 1 or len(files) < 2:
+                for file in files:
+                    with open(os.path.join(self.corpus_dir, file), 'r', encoding='utf-8') as f:
+                        text = f.read()
+                    self.corpus.add_text(text, file)
+            else:
+                self.corpus.add_files([(os.path.join(self.corpus_dir, file), file) for file in files],
+                                      self.processes)
         except Exception as e:
             print(e)
+        self.corpus.status_sig.disconnect(emit_status)
         self.busy_sig.emit(False)
         self.done.emit()
 
 
 class MyApp(QMainWindow, Ui_MainWindow):
 
+    # Number of worker processes used to load a directory (None - all cores, 1 - load sequentially)
+    load_processes = None
+    # Load NLTK models in a background thread once the window is shown, instead of on first use
+    warm_up_models = True
+    corpus_file_filter = "Corpus files (*.corpus);;Pickle files (*.pkl)"
+    # Word search: whether the typed prefix matches words regardless of case, maximum number of words shown
+    search_ignore_case = False
+    search_limit = 5000
+    # Color tokens of the raw and annotated texts with a QSyntaxHighlighter over the plain text,
+    # instead of rendering them as HTML spans (in chunks of annotated_chunk_size tokens)
+    highlight_tags = True
+    annotated_chunk_size = 2000
+
     cur_num = 0
     cur_word = None
     cur_tag = None
@@ -49,6 +79,10 @@ class MyApp(QMainWindow, Ui_MainWindow):
     cur_index = None
     cur_word_annot = None
     cur_tag_annot = None
+    # Text shown in the annotated tab
+    annotated_text_name = None
+    # An edit is being applied, the tokens of the edit controls are not looked up or edited until it is
+    edit_pending = False
 
     def _init_fields(self):
         self.pb_query: QPushButton = self.pb_query
@@ -68,7 +102,7 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.pb_edit: QPushButton = self.pb_edit
         self.le_search: QLineEdit = self.le_search
         self.le_editword: QLineEdit = self.le_editword
-        self.tw_wordfreq: QTableWidget = self.tw_wordfreq
+        self.tw_wordfreq: QTableView = self.tw_wordfreq
         self.tb_context: QTextBrowser = self.tb_context
         self.lw_tags: QListWidget = self.lw_tags
         self.pb_addtag: QPushButton = self.pb_addtag
@@ -87,9 +121,11 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.grid_legend: QGridLayout = self.grid_legend
         self.pb_edit_annot: QPushButton = self.pb_edit_annot
 
-        self.tw_stat_t: QTableWidget = self.tw_stat_t
-        self.tw_stat_wt: QTableWidget = self.tw_stat_wt
-        self.tw_stat_tt: QTableWidget = self.tw_stat_tt
+        self.tw_stat_t: QTableView = self.tw_stat_t
+        self.tw_stat_wt: QTableView = self.tw_stat_wt
+        self.tw_stat_tt: QTableView = self.tw_stat_tt
+        self.sb_stat_top: QSpinBox = self.sb_stat_top
+        self.sb_stat_min: QSpinBox = self.sb_stat_min
 
     def set_legend(self):
         colors = {}
@@ -122,6 +158,8 @@ class MyApp(QMainWindow, Ui_MainWindow):
 
         self.set_legend()
         self.keywords = None
+        self.hits = {}
+        self.annotated_chunks = None
 
         self.action_add.triggered.connect(self.open_dir)
         self.action_save.triggered.connect(self.save_corpus)
@@ -136,7 +174,7 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.le_search.returnPressed.connect(self.search)
         self.le_search.textChanged.connect(self.search)
         self.le_editword.returnPressed.connect(self.edit_word)
-        self.tw_wordfreq.itemClicked.connect(self.on_word_select)
+        self.tw_wordfreq.clicked.connect(self.on_word_select)
 
         self.lw_tags.itemClicked.connect(self.on_tag_select)
         self.pb_addtag.clicked.connect(self.add_tag)
@@ -151,13 +189,35 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.te_annotated.viewport().installEventFilter(self)
         self.cb_annotated.addItems(list(tag_colormap.keys()))
         self.pb_edit_annot.clicked.connect(self.edit_annot)
+        if self.highlight_tags:
+            self.annotated_highlighter = TagHighlighter(self.te_annotated.document())
+            self.raw_highlighter = TagHighlighter(self.tb_raw.document())
+
+        self.stat_t_model = StatsModel(('Tag', 'Frequency'), self)
+        self.stat_wt_model = StatsModel(('Word', 'Tag', 'Frequency'), self)
+        self.stat_tt_model = StatsModel(('Tag 1', 'Tag 2', 'Frequency'), self)
+        for view, model in ((self.tw_stat_t, self.stat_t_model), (self.tw_stat_wt, self.stat_wt_model),
+                            (self.tw_stat_tt, self.stat_tt_model)):
+            view.setModel(model)
+            view.sortByColumn(model.sort_column, model.sort_order)
+        self.sb_stat_top.valueChanged.connect(self.filter_stats)
+        self.sb_stat_min.valueChanged.connect(self.filter_stats)
 
         self.corpus = Corpus()
+        self.executor = TaskExecutor(parent=self)
+        self.word_model = WordFreqModel(self.corpus, self)
+        self.tw_wordfreq.setModel(self.word_model)
+        self.tw_wordfreq.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tw_wordfreq.sortByColumn(0, Qt.AscendingOrder)
+
+        if self.warm_up_models:
+            QTimer.singleShot(0, lambda: threading.Thread(target=warm_up, daemon=True).start())
 
     def eventFilter(self, obj, event):
         if obj == self.te_annotated.viewport():
             if event.type() == QEvent.MouseButtonRelease:
-                self.peek_word()
+                if not self.edit_pending:
+                    self.peek_word()
                 return True
         return False
 
@@ -171,15 +231,13 @@ class MyApp(QMainWindow, Ui_MainWindow):
             self.progress_bar.setRange(0, 100)
 
     def run_corpus_load_task(self, corpus_dir):
-        corpus_load_task = CorpusLoadTask(corpus_dir, self.corpus)
-        self.corpus.status_sig.connect(self.set_status)
+        corpus_load_task = CorpusLoadTask(corpus_dir, self.corpus, self.load_processes)
+        corpus_load_task.status_sig.connect(self.set_status)
 
         def on_corpus_loaded():
             self.corpus = corpus_load_task.corpus
-            words, modified = self.corpus.get_words()
-            self.load_words(words, modified)
-            self.lw_raw.clear()
-            self.lw_raw.addItems(self.corpus.get_text_names())
+            self.load_words()
+            self.load_text_names()
             self.set_status('Ready')
 
         corpus_load_task.done.connect(on_corpus_loaded)
@@ -196,33 +254,42 @@ class MyApp(QMainWindow, Ui_MainWindow):
         TagsDescriptionDialog(self).exec_()
 
     def search(self):
-        char_seq = self.le_search.text()
-        found, modified = self.corpus.get_words(reset_modified=False)
-        if not (char_seq is None or char_seq == ''):
-            reg = "^"+char_seq
-            found = [word for word in found if re.match(reg, word) is not None]
-        self.load_words(found, modified)
-
-    def on_word_select(self, item):
+        char_seq = self.le_search.text() or ''
+        self.word_model.set_filter(char_seq, self.search_ignore_case, self.search_limit if char_seq else None)
+        self.reload_words()
+
+    def reload_words(self, pop_modified=False):
+        self.run_task('words', self.word_model.words_reader(pop_modified),
+                      on_done=lambda result: self.word_model.reset(*result))
+
+    def on_word_select(self, index):
         self.gb_word.setEnabled(True)
         self.le_initform.setText('')
-        if item.column() != 0:
-            item = self.tw_wordfreq.item(item.row(), 0)
-        word = item.text()
+        word = self.word_model.word(index.row())
         self.cur_word = word
         self.cur_num = 0
         self.load_context()
         self.le_editword.setText(word)
         self.le_editword.setReadOnly(False)
-        tags = self.corpus.get_tags(word)
-        self.load_tags(tags)
+        self.executor.cancel('init_form')
+        self.lw_tags.clear()
+        self.run_task('tags', self.corpus.get_tags, word, on_done=partial(self.show_tags, word))
 
     def load_context(self):
-        context = self.corpus.get_word_context(self.cur_word, num=self.cur_num)
-        self.tb_context.setText(context)
-        next_i = self.corpus.find_index(self.cur_word, self.cur_num+1)
-        self.pb_prev.setEnabled(self.cur_num > 0)
-        self.pb_next.setEnabled(next_i is not None)
+        corpus, word, num = self.corpus, self.cur_word, self.cur_num
+        self.pb_prev.setEnabled(False)
+        self.pb_next.setEnabled(False)
+
+        def read_context():
+            return corpus.get_word_context(word, num=num), corpus.count_occurrences(word)
+
+        def show_context(result):
+            context, count = result
+            self.tb_context.setText(context)
+            self.pb_prev.setEnabled(num > 0)
+            self.pb_next.setEnabled(num+1 < count)
+
+        self.run_task('context', read_context, on_done=show_context)
 
     def next_context(self):
         self.cur_num += 1
@@ -238,56 +305,119 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.pb_removetag.setEnabled(True)
 
         self.cur_tag = item.text()
-        self.le_initform.setText(self.corpus.get_init_form(self.cur_word, self.cur_tag))
+        self.le_initform.setText('')
+        self.run_task('init_form', self.corpus.get_init_form, self.cur_word, self.cur_tag,
+                      on_done=self.le_initform.setText)
+
+    def run_task(self, channel, fn, *args, on_done=None, on_error=None, write=False):
+        """
+        Runs `fn(*args)` on the task executor holding the corpus lock, which makes the corpus calls of `fn`
+        atomic, see TaskExecutor.submit.
+        """
+        return self.executor.submit(channel, fn, *args, on_done=on_done, on_error=on_error, lock=self.corpus.lock,
+                                    write=write)
+
+    def run_edit(self, fn, *args, on_done=None):
+        """
+        Runs an edit as a write task, disabling the edit controls until it is applied: the tokens they refer to
+        are located by positions in the text, which the edit may shift.
+        """
+        self.set_edit_pending(True)
+        self.executor.cancel('peek')
+
+        def on_edited(result):
+            on_done(result)
+            self.set_edit_pending(False)
+
+        self.run_task(None, fn, *args, on_done=on_edited, on_error=lambda _: self.set_edit_pending(False),
+                      write=True)
+
+    def set_edit_pending(self, pending):
+        self.edit_pending = pending
+        self.pb_edit.setEnabled(not pending)
+        self.le_editword.setEnabled(not pending)
+        self.pb_edit_annot.setEnabled(not pending and self.cur_word_annot is not None)
+        # The annotated text is not reloaded meanwhile, it would not show the edit if read before it
+        self.action_annotate.setEnabled(not pending and self.cur_text_name is not None)
 
     def edit_word(self):
-        try:
-            new = self.le_editword.text()
-            index = self.corpus.find_index(self.cur_word, self.cur_num)
-            self.corpus.replace_word(index, new)
-            words, modified = self.corpus.get_words(reset_modified=False)
-            self.load_words(words, modified)
-            self.tb_context.setText('')
-            self.le_editword.setText('')
-            self.le_editword.setReadOnly(True)
-            self.lw_tags.clear()
-            self.gb_word.setEnabled(False)
-            self.pb_removetag.setEnabled(False)
-        except Exception as e:
-            print(e)
+        if self.edit_pending:
+            return
+        corpus = self.corpus
+        new = self.le_editword.text()
+        word, num = self.cur_word, self.cur_num
+
+        def replace_word():
+            corpus.replace_word(corpus.find_index(word, num), new)
+            return corpus.pop_changed_freqs(), corpus.pop_modified_words()
+
+        self.run_edit(replace_word, on_done=self.on_word_edited)
+
+    def on_word_edited(self, result):
+        self.word_model.refresh(*result)
+        for channel in ('context', 'tags', 'init_form'):
+            self.executor.cancel(channel)
+        self.tb_context.setText('')
+        self.le_editword.setText('')
+        self.le_editword.setReadOnly(True)
+        self.lw_tags.clear()
+        self.gb_word.setEnabled(False)
+        self.pb_removetag.setEnabled(False)
 
     def add_tag(self):
         tag = self.cb_tags.currentText()
         if tag in POS_TAGS:
-            word = self.cur_word
-            self.corpus.add_tag(word, tag)
+            corpus, word = self.corpus, self.cur_word
+
+            def add_tag():
+                corpus.add_tag(word, tag)
+                return corpus.get_tags(word)
+
+            self.executor.cancel('init_form')
             self.le_initform.setText('')
             self.le_initform.setEnabled(False)
             self.label_initform.setEnabled(False)
             self.pb_removetag.setEnabled(False)
-            self.load_tags(self.corpus.get_tags(word))
+            self.run_task(None, add_tag, on_done=partial(self.show_tags, word), write=True)
 
     def remove_tag(self):
         tag = self.cur_tag
         self.cur_tag = ''
         if tag is not None and tag != '':
-            word = self.cur_word
-            self.corpus.remove_tag(word, tag)
+            corpus, word = self.corpus, self.cur_word
+
+            def remove_tag():
+                corpus.remove_tag(word, tag)
+                return corpus.get_tags(word)
+
+            self.executor.cancel('init_form')
             self.le_initform.setText('')
             self.le_initform.setEnabled(False)
             self.label_initform.setEnabled(False)
             self.pb_removetag.setEnabled(False)
-            self.load_tags(self.corpus.get_tags(word))
+            self.run_task(None, remove_tag, on_done=partial(self.show_tags, word), write=True)
+
+    def show_tags(self, word, tags):
+        if word == self.cur_word:
+            self.load_tags(tags)
 
     def collect_stats(self):
-        tag_freq, word_tag_freq, tag_tag_freq = self.corpus.collect_stats()
+        # Stats are recomputed from a snapshot, without holding the corpus lock
+        self.executor.submit('stats', self.corpus.collect_stats, on_done=self.show_stats)
+
+    def show_stats(self, stats):
+        tag_freq, word_tag_freq, tag_tag_freq = stats
         try:
-            self.load_stats(self.tw_stat_t, tag_freq)
-            self.load_stats(self.tw_stat_wt, word_tag_freq)
-            self.load_stats(self.tw_stat_tt, tag_tag_freq)
+            self.stat_t_model.set_stats(tag_freq)
+            self.stat_wt_model.set_stats(word_tag_freq)
+            self.stat_tt_model.set_stats(tag_tag_freq)
         except Exception as e:
             print(e)
 
+    def filter_stats(self):
+        for model in (self.stat_t_model, self.stat_wt_model, self.stat_tt_model):
+            model.set_filter(self.sb_stat_top.value(), self.sb_stat_min.value())
+
     def peek_word(self):
         self.cur_word_annot = None
         self.cur_tag_annot = None
@@ -295,45 +425,123 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.le_annotated.setEnabled(False)
         self.cb_annotated.setEnabled(False)
         self.pb_edit_annot.setEnabled(False)
+        self.cur_index = None
         cursor = self.te_annotated.textCursor()
-        i = cursor.position()
-        tok_index, word, tag = self.corpus.find_word_by_raw_index(self.cur_text_name, i)
-        self.cur_index = tok_index
-        if word is not None:
-            self.cur_word_annot = word
-            self.cur_tag_annot = tag
-            self.le_annotated.setText(word)
-            self.cb_annotated.setCurrentText(tag)
-            self.cb_annotated.setEnabled(True)
-            self.le_annotated.setEnabled(True)
-            self.pb_edit_annot.setEnabled(True)
-            start, end = self.corpus.get_word_bounds(self.cur_text_name, tok_index)
-            cursor.setPosition(start)
-            cursor.setPosition(end, QTextCursor.KeepAnchor)
-            self.te_annotated.setTextCursor(cursor)
+        corpus, text_name, i = self.corpus, self.annotated_text_name, cursor.position()
+        if text_name is None:
+            return
+
+        def read_token():
+            tok_index, word, tag = corpus.find_word_by_raw_index(text_name, i)
+            bounds = corpus.get_word_bounds(text_name, tok_index) if word is not None else None
+            return tok_index, word, tag, bounds
+
+        def show_token(result):
+            tok_index, word, tag, bounds = result
+            self.cur_index = tok_index
+            if word is not None:
+                self.cur_word_annot = word
+                self.cur_tag_annot = tag
+                self.le_annotated.setText(word)
+                self.cb_annotated.setCurrentText(tag)
+                self.cb_annotated.setEnabled(True)
+                self.le_annotated.setEnabled(True)
+                self.pb_edit_annot.setEnabled(not self.edit_pending)
+                start, end = bounds
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                self.te_annotated.setTextCursor(cursor)
+
+        self.run_task('peek', read_token, on_done=show_token)
 
     def edit_annot(self):
+        if self.edit_pending:
+            return
         cursor = self.te_annotated.textCursor()
         word = self.le_annotated.text()
         tag = self.cb_annotated.currentText()
+        corpus, text_name, index = self.corpus, self.annotated_text_name, self.cur_index
+        highlight_tags = self.highlight_tags
+
+        def edit(fn, *args):
+            fn(*args)
+            # The highlighter reads a snapshot, it is given one with the edit
+            return (corpus.pop_changed_freqs(), corpus.pop_modified_words(),
+                    corpus.get_token_source(text_name) if highlight_tags else None)
+
+        def on_edited(result):
+            changed_freqs, modified_words, token_source = result
+            self.word_model.refresh(changed_freqs, modified_words)
+            # False if the text was cleared from the view meanwhile
+            shown = text_name == self.annotated_text_name
+            if shown and token_source is not None:
+                self.annotated_highlighter.set_token_source(token_source)
+            return shown
+
         if word != self.cur_word_annot:
-            self.corpus.replace_word(self.cur_index, word)
-            self.load_words(*self.corpus.get_words())
-            cursor.insertText(word)
+            def on_word_replaced(result):
+                if on_edited(result):
+                    cursor.insertText(word)
+                    self.cur_word_annot = word
+
+            self.run_edit(edit, corpus.replace_word, index, word, on_done=on_word_replaced)
         elif tag != self.cur_tag_annot:
-            self.corpus.replace_tag(self.cur_index, tag)
-            format = cursor.charFormat()
-            format.setBackground(QColor(tag_colormap[tag]))
-            cursor.setCharFormat(format)
+            def on_tag_replaced(result):
+                if not on_edited(result):
+                    return
+                self.cur_tag_annot = tag
+                if self.highlight_tags:
+                    self.annotated_highlighter.rehighlightBlock(cursor.block())
+                else:
+                    format = cursor.charFormat()
+                    format.setBackground(QColor(tag_colormap[tag]))
+                    cursor.setCharFormat(format)
+
+            self.run_edit(edit, corpus.replace_tag, index, tag, on_done=on_tag_replaced)
 
     def load_annotated(self):
         self.cur_word_annot = None
         self.cur_tag_annot = None
-        annotated_text = self.corpus.get_annotated_text(self.cur_text_name)
-        self.te_annotated.clear()
         self.te_annotated.setEnabled(True)
-        self.te_annotated.append(annotated_text)
         self.tabs.setCurrentIndex(2)
+        corpus, text_name = self.corpus, self.cur_text_name
+        self.annotated_text_name = text_name
+        if self.highlight_tags:
+            def read_text():
+                return corpus.get_raw_text(text_name), corpus.get_token_source(text_name)
+
+            def show_text(result):
+                text, token_source = result
+                self.annotated_highlighter.set_token_source(token_source)
+                self.te_annotated.setPlainText(text)
+
+            self.run_task('annotated', read_text, on_done=show_text)
+            return
+
+        def show_chunks(chunks):
+            self.te_annotated.clear()
+            self.annotated_chunks = iter(chunks)
+            self.insert_annotated_chunk(self.annotated_chunks)
+
+        chunk_size = self.annotated_chunk_size
+        self.executor.submit('annotated', lambda: list(corpus.iter_annotated_text(text_name, chunk_size)),
+                             on_done=show_chunks)
+
+    def insert_annotated_chunk(self, chunks):
+        """
+        Appends the next chunk of the annotated text and schedules the one after it, so that the window
+        stays responsive while a long text is rendered; stops once another text is loaded.
+        """
+        if chunks is not self.annotated_chunks:
+            return
+        chunk = next(chunks, None)
+        if chunk is None:
+            self.annotated_chunks = None
+            return
+        cursor = QTextCursor(self.te_annotated.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertHtml(chunk)
+        QTimer.singleShot(0, lambda: self.insert_annotated_chunk(chunks))
 
     def on_raw_select(self):
         selection = self.lw_raw.selectedItems()
@@ -342,58 +550,52 @@ class MyApp(QMainWindow, Ui_MainWindow):
             self.tb_raw.clear()
             self.tb_raw.setEnabled(False)
             self.action_annotate.setEnabled(False)
+            self.executor.cancel('text')
+            self.executor.cancel('annotated')
+            self.annotated_chunks = None
+            self.annotated_text_name = None
             self.te_annotated.clear()
             self.te_annotated.setEnabled(False)
             return
 
         self.cur_text_name = selection[0].text()
-        raw_text = self.corpus.get_raw_text(self.cur_text_name, self.keywords)
+        corpus, text_name, keywords = self.corpus, self.cur_text_name, self.keywords
+        hits = self.hits.get(text_name)
         self.tb_raw.setEnabled(True)
-        self.tb_raw.clear()
-        self.tb_raw.append(raw_text)
-        self.action_annotate.setEnabled(True)
-
-    def load_stats(self, tw, stats):
-        tw.setSortingEnabled(False)
-        tw.setRowCount(0)
-        for key, value in stats.items():
-            current_row_count = tw.rowCount()
-            tw.insertRow(current_row_count)
-            if tw == self.tw_stat_t:
-                item = QTableWidgetItem()
-                item.setData(Qt.DisplayRole, str(key))
-                tw.setItem(current_row_count, 0, item)
-                item = QTableWidgetItem()
-                item.setData(Qt.DisplayRole, value)
-                tw.setItem(current_row_count, 1, item)
-            else:
-                item = QTableWidgetItem()
-                item.setData(Qt.DisplayRole, key[0])
-                tw.setItem(current_row_count, 0, item)
-                item = QTableWidgetItem()
-                item.setData(Qt.DisplayRole, key[1])
-                tw.setItem(current_row_count, 1, item)
-                item = QTableWidgetItem()
-                item.setData(Qt.DisplayRole, value)
-                tw.setItem(current_row_count, 2, item)
-
-        tw.setSortingEnabled(True)
-
-    def load_words(self, word_list, modified=set()):
-        self.tw_wordfreq.setSortingEnabled(False)
-        self.tw_wordfreq.setRowCount(0)
-        self.tw_wordfreq.setHorizontalHeaderLabels(['Word', 'Frequency'])
-        for word in word_list:
-            current_row_count = self.tw_wordfreq.rowCount()
-            self.tw_wordfreq.insertRow(current_row_count)
-            item = QTableWidgetItem(word)
-            if word in modified:
-                item.setBackground(QColor('#ddffdd'))
-            self.tw_wordfreq.setItem(current_row_count, 0, item)
-            item = QTableWidgetItem()
-            item.setData(Qt.DisplayRole, self.corpus.get_freq(word))
-            self.tw_wordfreq.setItem(current_row_count, 1, item)
-        self.tw_wordfreq.setSortingEnabled(True)
+        if self.highlight_tags:
+            def read_text():
+                tokens = []
+                if keywords or hits:
+                    tokens = corpus.get_highlighted_tokens(text_name, keywords, hits=hits)
+                return corpus.get_raw_text(text_name), tokens
+
+            def show_text(result):
+                text, tokens = result
+                self.raw_highlighter.set_tokens(tokens)
+                self.tb_raw.setPlainText(text)
+
+            self.run_task('text', read_text, on_done=show_text)
+        else:
+            def show_html(raw_text):
+                self.tb_raw.clear()
+                self.tb_raw.append(raw_text)
+
+            self.run_task('text', corpus.get_raw_text, text_name, keywords, True, hits, on_done=show_html)
+        self.action_annotate.setEnabled(not self.edit_pending)
+
+    def load_words(self):
+        """
+        Reloads the word table from a newly loaded corpus, highlighting the words it added.
+        """
+        self.word_model.set_corpus(self.corpus)
+        self.reload_words(pop_modified=True)
+
+    def load_text_names(self):
+        self.run_task('query', self.corpus.get_text_names, on_done=self.show_text_names)
+
+    def show_text_names(self, text_names):
+        self.lw_raw.clear()
+        self.lw_raw.addItems(text_names)
 
     def load_tags(self, tags):
         self.pb_removetag.setEnabled(False)
@@ -401,35 +603,44 @@ class MyApp(QMainWindow, Ui_MainWindow):
         self.lw_tags.addItems(list(tags))
 
     def save_corpus(self):
-        filename, _ = QFileDialog.getSaveFileName(self, "Save Corpus", "../", "Pickle files (*.pkl)")
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Corpus", "../", self.corpus_file_filter)
         if filename is None or filename == '':
             return
-        self.corpus.save_to_pickle(filename)
+        save = self.corpus.save_to_pickle if filename.endswith('.pkl') else self.corpus.save_to_file
+        self.run_task(None, save, filename, write=True)
 
     def load_corpus(self):
-        filename, _ = QFileDialog.getOpenFileName(self, "Load Corpus", "../", "Pickle files (*.pkl)")
+        filename, _ = QFileDialog.getOpenFileName(self, "Load Corpus", "../", self.corpus_file_filter)
         if filename is None or filename == '':
             return
-        self.corpus.load_from_pickle(filename)
-        words, modified = self.corpus.get_words()
-        self.load_words(words, modified)
-        self.lw_raw.clear()
-        self.lw_raw.addItems(self.corpus.get_text_names())
+        corpus = self.corpus
+
+        def load():
+            if is_corpus_file(filename):
+                corpus.load_from_file(filename)
+            else:
+                corpus.load_from_pickle(filename)
+
+        def on_loaded(_):
+            self.load_words()
+            self.load_text_names()
+
+        self.run_task(None, load, on_done=on_loaded, write=True)
 
     def query(self):
-        relevant_texts = self.corpus.get_text_names()
-        try:
-            phrase = self.le_query.text()
-            self.keywords = None
-
-            if phrase:
-                relevant_texts_d, self.keywords = self.corpus.query(phrase)
-                relevant_texts = list(relevant_texts_d.keys())
-                relevant_texts.sort(key=lambda x: relevant_texts_d[x])
-            self.lw_raw.clear()
-            self.lw_raw.addItems(relevant_texts)
-        except Exception as e:
-            print(e)
+        phrase = self.le_query.text()
+        self.keywords = None
+        self.hits = {}
+        if phrase:
+            self.run_task('query', self.corpus.query, phrase, on_done=self.show_query_results)
+        else:
+            self.load_text_names()
+
+    def show_query_results(self, result):
+        relevant_texts, self.keywords, self.hits = result
+        # Texts come ranked best first
+        self.lw_raw.clear()
+        self.lw_raw.addItems(list(relevant_texts.keys()))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,364 @@
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tempfile
+import threading
+import traceback
+import subprocess
+import tracemalloc
+
+import nltk
+
+from Corpus import *
+from storage import TextStore
+
+
+BENCH_WORDS = (
+    "the a an and or but of to in on at by with from over under about after before "
+    "cat dog bird tree house river city road garden window table paper story letter "
+    "run runs running ran walk walked walking see saw seen look looked write wrote "
+    "quick slow happy sad green blue old new small large bright dark quiet loud "
+    "quickly slowly happily quietly never always often soon "
+    "John Mary London Paris Alice Bob"
+).split()
+
+
+def generate_text(size, seed=0, words=BENCH_WORDS):
+    """
+    Generates about `size` characters of sentence-like English text made of `words`.
+    """
+    rnd = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        sents = []
+        for _ in range(rnd.randint(2, 6)):
+            sent = [rnd.choice(words) for _ in range(rnd.randint(4, 20))]
+            sent[0] = sent[0].capitalize()
+            sents.append(' '.join(sent) + rnd.choice('..!?'))
+        paragraph = ' '.join(sents)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return '\n\n'.join(paragraphs)
+
+
+def load_texts(corpus_dir=None, size=4*2**20, num_texts=8):
+    """
+    Reads all files from `corpus_dir` or generates `num_texts` texts of `size` characters in total.
+    """
+    if corpus_dir:
+        texts = []
+        for file in sorted(os.listdir(corpus_dir)):
+            with open(os.path.join(corpus_dir, file), 'r', encoding='utf-8') as f:
+                texts.append((f.read(), file))
+        return texts
+    return [(generate_text(size // num_texts, seed=i), f'text{i}.txt') for i in range(num_texts)]
+
+
+def tokenize_sents(text):
+    tokenizer = get_tokenizer()
+    return [tokenizer.tokenize(sent) for sent in get_sent_tokenizer().tokenize(preprocess_text(text))]
+
+
+def bench_tagging(args):
+    texts = load_texts(args.dir, args.size)
+    print(f'Corpus: {len(texts)} texts, {sum(len(t) for t, _ in texts) / 2**20:.1f} MB')
+    sents = []
+    for text, _ in texts:
+        sents += tokenize_sents(text)
+    num_tokens = sum(len(tokens) for tokens in sents)
+    print(f'Tokens: {num_tokens}, sentences: {len(sents)}')
+
+    start = time.perf_counter()
+    tokens_tags = []
+    for tokens in sents:
+        tokens_tags += nltk.pos_tag(tokens)
+    per_sentence = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched_tags = tag_sents(sents)
+    batched = time.perf_counter() - start
+
+    assert batched_tags == tokens_tags
+    print(f'nltk.pos_tag per sentence: {per_sentence:8.2f} s, {num_tokens / per_sentence:12.0f} tokens/s')
+    print(f'batched tag_sents:         {batched:8.2f} s, {num_tokens / batched:12.0f} tokens/s')
+
+
+def token_spans(text):
+    """
+    Returns token (start, end) offsets of a text without tagging it.
+    """
+    tokenizer = get_tokenizer()
+    spans = []
+    for sent_start, sent_end in get_sent_tokenizer().span_tokenize(text):
+        for s, e in tokenizer.span_tokenize(text[sent_start:sent_end]):
+            spans.append((s + sent_start, e + sent_start))
+    return spans
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_memory(args):
+    texts = [(preprocess_text(text), name) for text, name in load_texts(args.dir, args.size)]
+    # Tags do not need the tagger here, any interned tag string is as good as a real one
+    spans = [token_spans(text) for text, _ in texts]
+    tags = [[POS_TAGS[(e - s) % len(POS_TAGS)] for s, e in text_spans] for text_spans in spans]
+    num_tokens = sum(len(text_spans) for text_spans in spans)
+    print(f'Corpus: {len(texts)} texts, {sum(len(t) for t, _ in texts) / 2**20:.1f} MB, {num_tokens} tokens')
+
+    def build_tuples():
+        tokenized_text = []
+        offset = 0
+        for (text, _), text_spans, text_tags in zip(texts, spans, tags):
+            tokenized_text += [(s + offset, text[s:e], tag) for (s, e), tag in zip(text_spans, text_tags)]
+            offset += len(text)
+        return tokenized_text
+
+    def build_store():
+        store = TextStore(Corpus.sep, POS_TAGS)
+        for (text, name), text_spans, text_tags in zip(texts, spans, tags):
+            store.add(name, text, [s for s, _ in text_spans], [text[s:e] for s, e in text_spans], text_tags)
+        return store
+
+    tokenized_text, tuples_size = measure(build_tuples)
+    del tokenized_text
+    # The raw text itself is shared by both layouts, so it is not counted
+    store, store_size = measure(build_store)
+    print(f'list of (start, word, tag): {tuples_size / 2**20:8.1f} MB, {tuples_size / num_tokens:6.1f} bytes/token')
+    print(f'columnar TextStore:         {store_size / 2**20:8.1f} MB, {store_size / num_tokens:6.1f} bytes/token'
+          f' (vocabulary: {len(store.vocab)} words)')
+
+
+# Runs in a fresh interpreter so that module imports are measured cold
+STARTUP_SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+import app
+from bench import generate_text
+times = {'import': time.perf_counter()}
+size, eager = int(sys.argv[1]), sys.argv[2] == 'eager'
+if eager:
+    app.warm_up()
+    app.MyApp.warm_up_models = False
+
+class PaintFilter(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and 'paint' not in times:
+            times['paint'] = time.perf_counter()
+            QTimer.singleShot(0, add_first_text)
+        return False
+
+def add_first_text():
+    window.corpus.add_text(generate_text(size), 'text0.txt')
+    times['add_text'] = time.perf_counter()
+    qapp.quit()
+
+qapp = QApplication(sys.argv[:1])
+window = app.MyApp()
+paint_filter = PaintFilter()
+window.installEventFilter(paint_filter)
+window.show()
+qapp.exec_()
+print(' '.join(f'{key}={t - start:.3f}' for key, t in times.items()))
+"""
+
+
+def bench_startup(args):
+    print(f'Seconds from interpreter start, median of {args.runs} runs, first text of {args.size} characters')
+    for mode in ('eager', 'lazy'):
+        runs = []
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, str(args.size), mode],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+            runs.append(dict((key, float(t)) for key, t in
+                             (item.split('=') for item in out.strip().splitlines()[-1].split())))
+        median = {key: sorted(run[key] for run in runs)[len(runs) // 2] for key in runs[0]}
+        print(f'{mode:5}: import {median["import"]:6.2f}, first paint {median["paint"]:6.2f}, '
+              f'first add_text {median["add_text"]:6.2f}')
+
+
+def bench_stress(args):
+    if args.dir:
+        texts = load_texts(args.dir)
+    else:
+        # Every text brings new words, so that the vocabulary grows while it is read
+        rnd = random.Random(0)
+        texts = []
+        for i in range(args.texts):
+            new_words = [''.join(rnd.choice(string.ascii_lowercase) for _ in range(8)) for _ in range(500)]
+            texts.append((generate_text(args.size // args.texts, i, BENCH_WORDS * 5 + new_words), f'text{i}.txt'))
+    print(f'Corpus: {len(texts)} texts, {sum(len(t) for t, _ in texts) / 2**20:.1f} MB, '
+          f'{args.readers} reader threads')
+    corpus = Corpus()
+    # Changes are logged in the order they are made, i.e. in the order they took the lock
+    corpus.journal = []
+    # The first text is loaded up front and retagged while the others are added, its token indices do not move
+    first_text, first_name = texts[0]
+    corpus.add_text(first_text, first_name)
+    tmp_dir = tempfile.TemporaryDirectory()
+    if args.corpus_file:
+        # Stats of a loaded corpus file are recomputed on first use, without holding the lock
+        path = os.path.join(tmp_dir.name, 'stress.corpus')
+        corpus.save_to_file(path)
+        corpus = Corpus()
+        corpus.load_from_file(path)
+    first, last = corpus.get_token_range(first_name)
+    rnd = random.Random(0)
+    indices = list(range(first, last))
+    rnd.shuffle(indices)
+    edits = []
+    edited = set()
+    for index in indices:
+        _, word, tag = corpus.tokenized_text[index]
+        # replace_tag drops the old tag of the word from the dictionary, so a word is retagged only once
+        if len(edits) < args.edits and word not in edited and tag in corpus.get_tags(word):
+            edited.add(word)
+            edits.append((index, rnd.choice([new_tag for new_tag in POS_TAGS if new_tag != tag])))
+    words = sorted(set(BENCH_WORDS))
+    latencies = []
+    errors = []
+    done = threading.Event()
+
+    def run(work, *work_args):
+        try:
+            work(*work_args)
+        except Exception:
+            errors.append(traceback.format_exc())
+
+    def load():
+        for text, text_name in texts[1:]:
+            corpus.add_text(text, text_name)
+
+    def edit():
+        for index, tag in edits:
+            corpus.replace_tag(index, tag)
+            time.sleep(0.001)
+
+    def read(seed):
+        rnd = random.Random(seed)
+        while not done.is_set():
+            start = time.perf_counter()
+            kind = rnd.randrange(5)
+            if kind == 0:
+                ''.join(corpus.iter_annotated_text(first_name))
+            elif kind == 1:
+                corpus.collect_stats()
+                # Stats and the dictionary count the same tokens, but a change updates them one after the other
+                with corpus.lock.read():
+                    stats = corpus.collect_stats()
+                    num_words = sum(freq for freq, _ in corpus.freq_tag_dict.values())
+                    store = corpus.store.snapshot()
+                assert sum(stats[0].values()) == num_words
+                # Stats recomputed from a snapshot without the lock are the ones kept up to date with it
+                assert corpus.stats_engine.collect(store) == stats
+            else:
+                phrase = ' '.join(rnd.sample(words, 2))
+                if kind == 3:
+                    phrase = f'"{phrase}"'
+                elif kind == 4:
+                    phrase = phrase.replace(' ', ' NEAR/5 ')
+                with corpus.lock.read():
+                    relevant_texts, _, hits = corpus.query(phrase)
+                    names = set(corpus.get_text_names())
+                    lengths = {name: len(corpus.store.segment(name)) for name in hits}
+                assert set(hits) <= set(relevant_texts) <= names, phrase
+                assert all(0 <= i < lengths[name] for name, text_hits in hits.items()
+                           for positions in text_hits for i in positions), phrase
+            latencies.append(time.perf_counter() - start)
+
+    # Threads are switched more often than by default, so that more interleavings are tried
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(args.switch_interval)
+    readers = [threading.Thread(target=run, args=(read, seed)) for seed in range(args.readers)]
+    writers = [threading.Thread(target=run, args=(work,)) for work in (load, edit)]
+    start = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in readers:
+        thread.join()
+    sys.setswitchinterval(switch_interval)
+
+    latencies.sort()
+    print(f'Loaded {len(texts) - 1} texts and made {len(edits)} tag edits in {elapsed:.2f} s, '
+          f'{len(latencies)} concurrent reads')
+    if latencies:
+        print(f'Read latency: median {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+              f'99% {latencies[len(latencies) * 99 // 100] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms')
+    for error in errors:
+        print(error)
+
+    # Applying the same changes one by one has to give the same corpus
+    reference = Corpus()
+    if args.corpus_file:
+        reference.load_from_file(path)
+    for record in corpus.journal:
+        reference.replay(record)
+    consistent = (len(corpus.get_text_names()) == len(texts)
+                  and list(corpus.tokenized_text) == list(reference.tokenized_text)
+                  and corpus.freq_tag_dict == reference.freq_tag_dict
+                  and corpus.collect_stats() == reference.collect_stats()
+                  and corpus.collect_stats() == corpus.stats_engine.collect(corpus.store)
+                  and all(corpus.query(word) == reference.query(word) for word in words))
+    print(f'Errors: {len(errors)}, same as the changes made one by one: {"yes" if consistent else "no"}')
+    corpus.release_file()
+    reference.release_file()
+    tmp_dir.cleanup()
+    return 0 if consistent and not errors else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Corpus benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser('tagging', help='POS tagging throughput, per sentence vs batched')
+    p.add_argument('--dir', help='directory with UTF-8 text files (default: generated text)')
+    p.add_argument('--size', type=int, default=4*2**20, help='size of generated corpus in characters')
+    p.set_defaults(func=bench_tagging)
+
+    p = subparsers.add_parser('memory', help='memory of list of token tuples vs columnar token store')
+    p.add_argument('--dir', help='directory with UTF-8 text files (default: generated text)')
+    p.add_argument('--size', type=int, default=4*2**20, help='size of generated corpus in characters')
+    p.set_defaults(func=bench_memory)
+
+    p = subparsers.add_parser('startup', help='time to first paint and to first add_text of app.py, '
+                                              'models loaded before the window (eager) vs lazily (lazy)')
+    p.add_argument('--size', type=int, default=20000, help='size of the first added text in characters')
+    p.add_argument('--runs', type=int, default=3, help='number of runs of each mode')
+    p.set_defaults(func=bench_startup)
+
+    p = subparsers.add_parser('stress', help='queries and reads running while texts are added and retagged, '
+                                             'checked against the changes made one by one')
+    p.add_argument('--dir', help='directory with UTF-8 text files (default: generated text)')
+    p.add_argument('--size', type=int, default=2**20, help='size of generated corpus in characters')
+    p.add_argument('--texts', type=int, default=8, help='number of generated texts')
+    p.add_argument('--readers', type=int, default=4, help='number of reader threads')
+    p.add_argument('--edits', type=int, default=50, help='maximum number of tag edits')
+    p.add_argument('--corpus-file', action='store_true',
+                   help='start from a corpus file, whose stats are recomputed from snapshots')
+    p.add_argument('--switch-interval', type=float, default=1e-5, help='thread switch interval in seconds')
+    p.set_defaults(func=bench_stress)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Headless corpus processing, run from the App directory:
+
+    python -m corpus_cli build TEXTS_DIR CORPUS [--processes N] [--append]
+    python -m corpus_cli stats CORPUS [--top N]
+    python -m corpus_cli query CORPUS PHRASE [--top N]
+    python -m corpus_cli export CORPUS OUTPUT [--what tokens|words]
+
+CORPUS is a corpus file (see corpus_format) or a pickled corpus if its name ends with .pkl.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from Corpus import Corpus, list_text_files
+from corpus_format import is_corpus_file
+
+
+def print_status(status):
+    print(status, flush=True)
+
+
+def load_corpus(path):
+    corpus = Corpus()
+    corpus.status_sig.connect(print_status)
+    if is_corpus_file(path):
+        corpus.load_from_file(path)
+    else:
+        corpus.load_from_pickle(path)
+    return corpus
+
+
+def save_corpus(corpus, path):
+    if path.endswith('.pkl'):
+        corpus.save_to_pickle(path)
+    else:
+        corpus.save_to_file(path)
+
+
+def build(args):
+    start = time.perf_counter()
+    if args.append and os.path.exists(args.corpus):
+        corpus = load_corpus(args.corpus)
+    else:
+        corpus = Corpus()
+        corpus.status_sig.connect(print_status)
+    files = list_text_files(args.texts_dir)
+    if args.processes == 1 or len(files) < 2:
+        for file in files:
+            with open(os.path.join(args.texts_dir, file), 'r', encoding='utf-8') as f:
+                text = f.read()
+            corpus.add_text(text, file)
+    else:
+        corpus.add_files([(os.path.join(args.texts_dir, file), file) for file in files], args.processes)
+    print_status(f'Saving {args.corpus} ...')
+    save_corpus(corpus, args.corpus)
+    print_status(f'Added {len(files)} texts, {len(corpus.get_text_names())} texts and '
+                 f'{len(corpus.tokenized_text)} tokens in the corpus ({time.perf_counter() - start:.1f} s)')
+
+
+def stats(args):
+    tag_freq, word_tag_freq, tag_tag_freq = load_corpus(args.corpus).collect_stats()
+    for title, freq in (('Tag', tag_freq), ('Word, tag', word_tag_freq), ('Tag, tag', tag_tag_freq)):
+        print(f'{title}\tFrequency')
+        for key, count in sorted(freq.items(), key=lambda kv: -kv[1])[:args.top]:
+            print('\t'.join(key if isinstance(key, tuple) else (key,)) + f'\t{count}')
+        print()
+
+
+def query(args):
+    relevant_texts, keywords, hits = load_corpus(args.corpus).query(args.phrase, args.top, not args.exact_forms)
+    print('Keywords: ' + ', '.join(keywords))
+    for text_name, score in relevant_texts.items():
+        print(f'{score:.4f}\t{text_name}' + (f'\t{len(hits[text_name])} hits' if text_name in hits else ''))
+
+
+def export(args):
+    corpus = load_corpus(args.corpus)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        if args.what == 'tokens':
+            out.write('text\tstart\tword\ttag\n')
+            for text_name in corpus.get_text_names():
+                for start, word, tag in corpus.store.iter_text_tokens(text_name):
+                    out.write(f'{text_name}\t{start}\t{word}\t{tag}\n')
+        else:
+            out.write('word\tfrequency\ttags\n')
+            words, _ = corpus.get_words()
+            for word in words:
+                freq, tags = corpus.freq_tag_dict[word]
+                out.write(f'{word}\t{freq}\t' + ' '.join(f'{tag}:{init}' for tag, init in tags.items()) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m corpus_cli', description='Headless corpus processing')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser('build', help='add all files of a directory to a corpus and save it')
+    p.add_argument('texts_dir')
+    p.add_argument('corpus')
+    p.add_argument('--processes', type=int, help='number of worker processes (default: all cores, 1 - sequential)')
+    p.add_argument('--append', action='store_true', help='add the texts to the corpus if it exists')
+    p.set_defaults(func=build)
+
+    p = subparsers.add_parser('stats', help='print tag, word-tag and tag-tag frequencies')
+    p.add_argument('corpus')
+    p.add_argument('--top', type=int, default=20, help='number of most frequent entries of each table')
+    p.set_defaults(func=stats)
+
+    p = subparsers.add_parser('query', help='print texts most relevant to a phrase')
+    p.add_argument('corpus')
+    p.add_argument('phrase')
+    p.add_argument('--top', type=int, default=10, help='number of texts')
+    p.add_argument('--exact-forms', action='store_true', help='match keywords by their case forms, not by lemmas')
+    p.set_defaults(func=query)
+
+    p = subparsers.add_parser('export', help='write tokens or the word dictionary as TSV')
+    p.add_argument('corpus')
+    p.add_argument('output', help='output file, - for stdout')
+    p.add_argument('--what', choices=('tokens', 'words'), default='tokens')
+    p.set_defaults(func=export)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,381 @@
+"""
+Binary corpus file, version 1.
+
+A header (magic, version, byte order, number of sections) is followed by a table of sections
+(name, offset, size) and the sections themselves, each aligned to 8 bytes:
+
+    meta      JSON: separator, text names, tag vocabulary
+    texts     int64 per text: UTF-8 byte start and end in `raw`, length in characters
+    raw       UTF-8 texts one after another
+    ntokens   int64 per text + 1: index of the first token of each text
+    starts    int64 per token: start relative to the text
+    wordids   uint32 per token: id in the vocabulary
+    tagids    uint8 per token: id in the tag vocabulary
+    vocab     string table of the vocabulary
+    lowerids  uint32 per vocabulary entry: id of its lowercased form
+    lemmas    string table of lemmas of the dictionaries
+    dicts     int64 per dictionary + 1: first word row of the corpus dictionary and of each text
+    dwords    uint32 per word row: word id
+    dfreqs    uint32 per word row: frequency
+    dtagrows  int64 per word row + 1: first tag row of the word
+    dtags     uint8 per tag row: tag id
+    dlemmas   uint32 per tag row: lemma id (NO_LEMMA for None)
+    infs      int64 per text + 1: first row of the informative words of each text
+    infwords  uint32 per row: word id
+    infwgts   float64 per row: weight
+    lcache    string table of the lemma cache: word, WordNet POS and lemma of each entry
+
+A string table is int64 byte offsets of its n strings + 1 followed by the UTF-8 strings.
+
+The sections may be followed by a journal of changes made after they were written: records of
+payload length (uint32) and CRC-32 (uint32) followed by the payload, a JSON list [operation, *arguments].
+A truncated or corrupted record ends the journal.
+Integers use the byte order of the writing machine, a file is opened only on a machine of the same order.
+"""
+
+import os
+import sys
+import json
+import mmap
+import zlib
+import struct
+from array import array
+from collections.abc import MutableMapping
+
+from storage import TextStore, TextSegment, Vocabulary, to_array
+
+
+MAGIC = b'BSUCORP\n'
+VERSION = 1
+HEADER = struct.Struct('<8sIII')
+SECTION = struct.Struct('<8sQQ')
+RECORD = struct.Struct('<II')
+SECTIONS = ('meta', 'texts', 'raw', 'ntokens', 'starts', 'wordids', 'tagids', 'vocab', 'lowerids',
+            'lemmas', 'dicts', 'dwords', 'dfreqs', 'dtagrows', 'dtags', 'dlemmas',
+            'infs', 'infwords', 'infwgts', 'lcache')
+BYTE_ORDERS = ('little', 'big')
+NO_LEMMA = 2**32 - 1
+ALIGN = 8
+
+
+class CorpusFormatError(Exception):
+    pass
+
+
+def is_corpus_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def string_table(strings):
+    offsets = array('q', [0])
+    blobs = []
+    for s in strings:
+        blob = s.encode('utf-8')
+        blobs.append(blob)
+        offsets.append(offsets[-1] + len(blob))
+    return offsets.tobytes() + b''.join(blobs)
+
+
+def encode_records(records):
+    data = []
+    for record in records:
+        payload = json.dumps(record, ensure_ascii=False).encode('utf-8')
+        data.append(RECORD.pack(len(payload), zlib.crc32(payload)))
+        data.append(payload)
+    return b''.join(data)
+
+
+def append_records(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class StringTable:
+    """
+    Read-only sequence of the strings of a string table, each decoded on access.
+    """
+
+    def __init__(self, buf, count):
+        self.offsets = buf[:(count + 1) * 8].cast('q')
+        self.blob = buf[(count + 1) * 8:]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        blob = self.blob
+        offsets = self.offsets
+        for i in range(len(offsets) - 1):
+            yield str(blob[offsets[i]:offsets[i + 1]], 'utf-8')
+
+
+class LazyDicts(MutableMapping):
+    """
+    Mapping: text name -> dictionary, each dictionary is decoded by `load(text ordinal)` on first access.
+    """
+
+    def __init__(self, names, load):
+        self.dicts = dict.fromkeys(names)
+        self.ordinals = {name: k for k, name in enumerate(names)}
+        self.load = load
+
+    def __getitem__(self, text_name):
+        d = self.dicts[text_name]
+        if d is None:
+            d = self.dicts[text_name] = self.load(self.ordinals[text_name])
+        return d
+
+    def __setitem__(self, text_name, d):
+        self.dicts[text_name] = d
+
+    def __delitem__(self, text_name):
+        del self.dicts[text_name]
+
+    def __iter__(self):
+        return iter(self.dicts)
+
+    def __len__(self):
+        return len(self.dicts)
+
+
+class CorpusWriter:
+
+    def __init__(self, f):
+        self.f = f
+        self.sections = []
+        f.write(b'\0' * (HEADER.size + SECTION.size * len(SECTIONS)))
+        self.pad()
+
+    def pad(self):
+        self.f.write(b'\0' * (-self.f.tell() % ALIGN))
+
+    def write(self, name, *parts):
+        offset = self.f.tell()
+        for part in parts:
+            self.f.write(part)
+        self.sections.append((name, offset, self.f.tell() - offset))
+        self.pad()
+
+    def close(self):
+        assert [name for name, _, _ in self.sections] == list(SECTIONS)
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS.index(sys.byteorder), len(self.sections)))
+        for name, offset, size in self.sections:
+            self.f.write(SECTION.pack(name.encode('ascii'), offset, size))
+
+
+def encode_dicts(dicts, store, lemma_ids):
+    """
+    Returns the columns of word rows and tag rows of dictionaries {word: [freq, {tag: lemma}]}.
+    """
+    vocab, tag_vocab = store.vocab, store.tag_vocab
+    first_rows = array('q', [0])
+    words, freqs, first_tags = array('I'), array('I'), array('q', [0])
+    tags, lemmas = array('B'), array('I')
+    for d in dicts:
+        for word, (freq, word_tags) in d.items():
+            words.append(vocab.add(word))
+            freqs.append(freq)
+            for tag, lemma in word_tags.items():
+                tags.append(tag_vocab.add(tag))
+                lemmas.append(NO_LEMMA if lemma is None else lemma_ids.setdefault(lemma, len(lemma_ids)))
+            first_tags.append(len(tags))
+        first_rows.append(len(words))
+    return first_rows, words, freqs, first_tags, tags, lemmas
+
+
+def write_corpus(path, store, freq_tag_dict, text_dicts, text_inf_dicts, lemma_items):
+    """
+    Writes the corpus to `path` through a temporary file, so that a failed write leaves the file intact.
+    A file mapped by a CorpusFile can be replaced only on POSIX systems, elsewhere it has to be closed first.
+    """
+    names = store.names
+    lemma_ids = {}
+    dict_columns = encode_dicts([freq_tag_dict] + [text_dicts[name] for name in names], store, lemma_ids)
+    inf_rows = array('q', [0])
+    inf_words, inf_weights = array('I'), array('d')
+    for name in names:
+        for word, weight in text_inf_dicts[name].items():
+            inf_words.append(store.vocab.add(word))
+            inf_weights.append(weight)
+        inf_rows.append(len(inf_words))
+    lemma_cache = []
+    for (word, wtag), lemma in lemma_items:
+        lemma_cache += (word, wtag, lemma)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        writer = CorpusWriter(f)
+        meta = {'sep': store.sep, 'names': names, 'tags': store.tag_vocab.words,
+                'vocab': len(store.vocab), 'lemmas': len(lemma_ids), 'lcache': len(lemma_cache)}
+        writer.write('meta', json.dumps(meta).encode('utf-8'))
+        texts = array('q')
+        blobs = []
+        size = 0
+        for segment in store.segments:
+            blob = segment.text.encode('utf-8')
+            blobs.append(blob)
+            texts.extend((size, size + len(blob), segment.length))
+            size += len(blob)
+        writer.write('texts', texts)
+        writer.write('raw', *blobs)
+        del blobs
+        writer.write('ntokens', store.first_tokens, array('q', [store.num_tokens]))
+        writer.write('starts', *(segment.starts for segment in store.segments))
+        writer.write('wordids', *(segment.word_ids for segment in store.segments))
+        writer.write('tagids', *(segment.tag_ids for segment in store.segments))
+        writer.write('vocab', string_table(store.vocab.words))
+        writer.write('lowerids', store.vocab.lower_ids)
+        writer.write('lemmas', string_table(lemma_ids))
+        for name, column in zip(('dicts', 'dwords', 'dfreqs', 'dtagrows', 'dtags', 'dlemmas'), dict_columns):
+            writer.write(name, column)
+        writer.write('infs', inf_rows)
+        writer.write('infwords', inf_words)
+        writer.write('infwgts', inf_weights)
+        writer.write('lcache', string_table(lemma_cache))
+        writer.close()
+    os.replace(tmp_path, path)
+
+
+class CorpusFile:
+    """
+    Corpus file opened through mmap: texts are decoded, and token columns and dictionaries are read,
+    only when accessed. The mapping is copy-on-write, so retagging a token never touches the file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        buf = memoryview(self.map)
+        magic, version, byte_order, num_sections = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise CorpusFormatError(f'{path} is not a corpus file')
+        if version != VERSION:
+            raise CorpusFormatError(f'unsupported corpus file version {version}')
+        if BYTE_ORDERS[byte_order] != sys.byteorder:
+            raise CorpusFormatError(f'corpus file is {BYTE_ORDERS[byte_order]}-endian')
+        self.sections = {}
+        end = 0
+        for i in range(num_sections):
+            name, offset, size = SECTION.unpack_from(buf, HEADER.size + i * SECTION.size)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = buf[offset:offset + size]
+            end = max(end, offset + size)
+        # Size of the file without the journal, and with the valid journal records once they are read
+        self.base_size = self.end = end + -end % ALIGN
+        self.meta = json.loads(str(self.sections['meta'], 'utf-8'))
+
+        self.lemmas = StringTable(self.sections['lemmas'], self.meta['lemmas'])
+        self.dict_rows = self.column('dicts', 'q')
+        self.dict_words = self.column('dwords', 'I')
+        self.dict_freqs = self.column('dfreqs', 'I')
+        self.dict_tag_rows = self.column('dtagrows', 'q')
+        self.dict_tags = self.column('dtags', 'B')
+        self.dict_lemmas = self.column('dlemmas', 'I')
+        self.inf_rows = self.column('infs', 'q')
+        self.inf_words = self.column('infwords', 'I')
+        self.inf_weights = self.column('infwgts', 'd')
+
+        self.store = self.read_store()
+
+    def close(self):
+        """
+        Unmaps the file. Everything read lazily from it (texts, token columns, dictionaries, lemmas)
+        has to be loaded before, the mapping stays open while any view of it is alive.
+        """
+        mapping = self.map
+        # Drops the views of the mapping held by the file itself
+        vars(self).clear()
+        try:
+            mapping.close()
+        except BufferError:
+            # Closed when the last view of it is released
+            pass
+
+    def column(self, name, typecode):
+        return self.sections[name].cast(typecode)
+
+    def read_store(self):
+        store = TextStore(self.meta['sep'], self.meta['tags'])
+        store.vocab = vocab = Vocabulary.from_table(StringTable(self.sections['vocab'], self.meta['vocab']),
+                                                    to_array('I', self.sections['lowerids'].cast('I')))
+
+        texts = self.column('texts', 'q')
+        first_tokens = self.column('ntokens', 'q')
+        starts = self.column('starts', 'q')
+        word_ids = self.column('wordids', 'I')
+        tag_ids = self.column('tagids', 'B')
+        raw = self.sections['raw']
+        for k, name in enumerate(self.meta['names']):
+            first, last = first_tokens[k], first_tokens[k + 1]
+            blob = raw[texts[3 * k]:texts[3 * k + 1]]
+            segment = TextSegment(lambda blob=blob: str(blob, 'utf-8'), starts[first:last],
+                                  word_ids[first:last], tag_ids[first:last], vocab.lower_ids,
+                                  length=texts[3 * k + 2])
+            store.add_segment(name, segment)
+        return store
+
+    def read_dict(self, k):
+        """
+        Returns dictionary `k`: 0 - of the corpus, k + 1 - of the text with ordinal k.
+        """
+        words = self.store.vocab.words
+        tags = self.store.tag_vocab.words
+        d = {}
+        for row in range(self.dict_rows[k], self.dict_rows[k + 1]):
+            word_tags = {}
+            for tag_row in range(self.dict_tag_rows[row], self.dict_tag_rows[row + 1]):
+                lemma = self.dict_lemmas[tag_row]
+                word_tags[tags[self.dict_tags[tag_row]]] = None if lemma == NO_LEMMA else self.lemmas[lemma]
+            d[words[self.dict_words[row]]] = [self.dict_freqs[row], word_tags]
+        return d
+
+    def read_inf_dict(self, k):
+        words = self.store.vocab.words
+        return {words[self.inf_words[row]]: self.inf_weights[row]
+                for row in range(self.inf_rows[k], self.inf_rows[k + 1])}
+
+    def text_dicts(self):
+        return LazyDicts(self.meta['names'], lambda k: self.read_dict(k + 1))
+
+    def text_inf_dicts(self):
+        return LazyDicts(self.meta['names'], self.read_inf_dict)
+
+    def read_journal(self):
+        records = []
+        pos = self.base_size
+        while pos + RECORD.size <= len(self.map):
+            length, crc = RECORD.unpack_from(self.map, pos)
+            payload = self.map[pos + RECORD.size:pos + RECORD.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            records.append(json.loads(str(payload, 'utf-8')))
+            pos += RECORD.size + length
+        self.end = pos
+        return records
+
+    def lemma_items(self):
+        table = StringTable(self.sections['lcache'], self.meta['lcache'])
+        return [((table[i], table[i + 1]), table[i + 2]) for i in range(0, len(table), 3)]
+
+
+def main(argv=None):
+    import argparse
+    from Corpus import Corpus
+
+    parser = argparse.ArgumentParser(description='Converts a pickled corpus (.pkl) to a corpus file')
+    parser.add_argument('pickle_file')
+    parser.add_argument('corpus_file')
+    args = parser.parse_args(argv)
+    corpus = Corpus()
+    corpus.load_from_pickle(args.pickle_file)
+    corpus.save_to_file(args.corpus_file)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
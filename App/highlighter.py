@@ -0,0 +1,43 @@
+from bisect import bisect_left
+
+from PyQt5.QtGui import *
+
+from Corpus import get_color
+
+
+class TagHighlighter(QSyntaxHighlighter):
+    """
+    Colors tokens of a plain text document by their tags, block by block as Qt lays them out,
+    so the document holds only the text and retagging a token rehighlights only its block.
+    Tokens come from a function (start, end) -> [(start, length, tag)] of the tokens starting
+    in [start, end) of the document.
+    """
+
+    def __init__(self, document):
+        super(TagHighlighter, self).__init__(document)
+        self.get_tokens = None
+        self.formats = {}
+
+    def set_token_source(self, get_tokens):
+        self.get_tokens = get_tokens
+
+    def set_tokens(self, tokens):
+        """
+        Colors `tokens`, [(start, length, tag)] sorted by start.
+        """
+        starts = [start for start, _, _ in tokens]
+        self.get_tokens = lambda start, end: tokens[bisect_left(starts, start):bisect_left(starts, end)]
+
+    def tag_format(self, tag):
+        text_format = self.formats.get(tag)
+        if text_format is None:
+            text_format = self.formats[tag] = QTextCharFormat()
+            text_format.setBackground(QColor(get_color(tag)))
+        return text_format
+
+    def highlightBlock(self, text):
+        if self.get_tokens is None:
+            return
+        position = self.currentBlock().position()
+        for start, length, tag in self.get_tokens(position, position + len(text)):
+            self.setFormat(start - position, length, self.tag_format(tag))
@@ -0,0 +1,272 @@
+import heapq
+from bisect import bisect_left
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+
+class WordFreqModel(QAbstractTableModel):
+    """
+    Words of the corpus dictionary and their frequencies. Rows are sorted by the model and filtered
+    by a prefix through the prefix index of the corpus; a view asks only for the data of the rows it shows.
+    Words and their frequencies are read from the corpus by the caller, in a task (see `words_reader`),
+    and passed to `reset` and `refresh`; the model shows only those, it reads the corpus only in that task.
+    """
+
+    headers = ('Word', 'Frequency')
+    modified_color = QColor('#ddffdd')
+
+    def __init__(self, corpus, parent=None):
+        super(WordFreqModel, self).__init__(parent)
+        self.corpus = corpus
+        # Words shown in ascending order of their sort keys, rows are reversed for descending order
+        self.words = []
+        # Word -> frequency of the words shown
+        self.freqs = {}
+        self.keys = []
+        self.word_keys = {}
+        self.prefix = ''
+        self.ignore_case = False
+        self.limit = None
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+        # Words highlighted as added to the corpus by the last load or edit
+        self.modified = set()
+        # ({word: frequency}, added words or None) refreshed while the rows are read, refreshed again after reset
+        self.pending = None
+
+    def sort_key(self, word, freq):
+        if self.sort_column == 1:
+            return freq, word.lower(), word
+        return word.lower(), word
+
+    def row(self, i):
+        """
+        Returns the row of the i-th word in ascending order, or the position of the word of row `i`.
+        """
+        return i if self.sort_order == Qt.AscendingOrder else len(self.words) - 1 - i
+
+    def word(self, row):
+        return self.words[self.row(row)]
+
+    def matches(self, word):
+        if self.ignore_case:
+            return word.lower().startswith(self.prefix.lower())
+        return word.startswith(self.prefix)
+
+    def set_corpus(self, corpus):
+        self.corpus = corpus
+
+    def set_filter(self, prefix, ignore_case=False, limit=None):
+        """
+        Shows at most `limit` (all if None) words starting with `prefix`, once the rows are reset.
+        """
+        self.prefix = prefix
+        self.ignore_case = ignore_case
+        self.limit = limit
+
+    def words_reader(self, pop_modified=False):
+        """
+        Returns a function reading ({word: frequency} of the rows, words added to the corpus) from the corpus,
+        which may be called in any thread; its result is shown by `reset`. With `pop_modified`, e.g. after a load,
+        the added words are shown once, see Corpus.pop_modified_words.
+        """
+        corpus, prefix, ignore_case, limit = self.corpus, self.prefix, self.ignore_case, self.limit
+        self.pending = {}, None
+
+        def read_words():
+            with corpus.lock.read():
+                corpus.pop_changed_words()
+                if prefix:
+                    words = corpus.find_words(prefix, ignore_case, limit)
+                else:
+                    words, _ = corpus.get_words()
+                modified = corpus.pop_modified_words() if pop_modified else set(corpus.modified_words)
+                return {word: corpus.get_freq(word) for word in words}, modified
+
+        return read_words
+
+    def reset(self, freqs, modified):
+        """
+        Replaces all rows with the words of `freqs` and the highlighted words with `modified`, read by
+        a function of `words_reader`.
+        """
+        self.beginResetModel()
+        self.modified = modified
+        self.set_words(freqs)
+        self.endResetModel()
+        pending, self.pending = self.pending, None
+        if pending is not None:
+            self.refresh(*pending)
+
+    def set_words(self, freqs):
+        # A key ends with its word; words come in the order of the prefix index, so sorting by word is linear
+        if self.sort_column == 1:
+            keys = [(freq, word.lower(), word) for word, freq in freqs.items()]
+        else:
+            keys = [(word.lower(), word) for word in freqs]
+        self.freqs = freqs
+        keys.sort()
+        self.keys = keys
+        self.words = [key[-1] for key in keys]
+        self.word_keys = dict(zip(self.words, keys))
+
+    def refresh(self, freqs, modified=None):
+        """
+        Updates only the rows of the words of `freqs`, {word: frequency} of the words whose frequency changed
+        (see Corpus.pop_changed_freqs), and highlights `modified` instead of the words highlighted so far
+        if it is given.
+        """
+        if self.pending is not None:
+            pending, pending_modified = self.pending
+            pending.update(freqs)
+            self.pending = pending, (pending_modified if modified is None else modified)
+        if modified is not None:
+            self.modified = modified
+            if self.words:
+                self.dataChanged.emit(self.index(0, 0), self.index(len(self.words) - 1, 0), [Qt.BackgroundRole])
+        root = QModelIndex()
+        for word, freq in freqs.items():
+            in_corpus = freq > 0
+            key = self.word_keys.pop(word, None)
+            if key is not None:
+                i = bisect_left(self.keys, key)
+                if in_corpus and self.sort_key(word, freq) == key:
+                    self.word_keys[word] = key
+                    self.freqs[word] = freq
+                    row = self.row(i)
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.headers) - 1))
+                    continue
+                row = self.row(i)
+                self.beginRemoveRows(root, row, row)
+                del self.keys[i]
+                del self.words[i]
+                del self.freqs[word]
+                self.endRemoveRows()
+            if in_corpus and self.matches(word):
+                key = self.sort_key(word, freq)
+                i = bisect_left(self.keys, key)
+                row = i if self.sort_order == Qt.AscendingOrder else len(self.words) - i
+                self.beginInsertRows(root, row, row)
+                self.keys.insert(i, key)
+                self.words.insert(i, word)
+                self.word_keys[word] = key
+                self.freqs[word] = freq
+                self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        indexes = self.persistentIndexList()
+        words = [self.word(index.row()) for index in indexes]
+        self.sort_column = column
+        self.sort_order = order
+        self.set_words(self.freqs)
+        self.changePersistentIndexList(indexes, [self.index(self.row(bisect_left(self.keys, self.word_keys[word])),
+                                                            index.column())
+                                                 for word, index in zip(words, indexes)])
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.words)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        word = self.word(index.row())
+        if role == Qt.DisplayRole:
+            return word if index.column() == 0 else self.freqs[word]
+        if role == Qt.BackgroundRole and index.column() == 0 and word in self.modified:
+            return self.modified_color
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            if role == Qt.DisplayRole:
+                return self.headers[section]
+            if role == Qt.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+        return None
+
+
+class StatsModel(QAbstractTableModel):
+    """
+    Table of a frequency dict of collect_stats, {key or (key, key): count}; the last column is the count.
+    Rows are the `top` (all if 0) most frequent keys counted at least `min_count` times, sorted by the model.
+    """
+
+    def __init__(self, headers, parent=None):
+        super(StatsModel, self).__init__(parent)
+        self.headers = headers
+        self.stats = {}
+        self.keys = []
+        self.top = 0
+        self.min_count = 1
+        self.sort_column = len(headers) - 1
+        self.sort_order = Qt.DescendingOrder
+
+    def set_stats(self, stats):
+        self.stats = stats
+        self.update_rows()
+
+    def set_filter(self, top=0, min_count=1):
+        self.top = top
+        self.min_count = min_count
+        self.update_rows()
+
+    def update_rows(self):
+        self.beginResetModel()
+        keys = self.stats.keys()
+        if self.min_count > 1:
+            keys = [key for key, count in self.stats.items() if count >= self.min_count]
+        if self.top:
+            keys = heapq.nlargest(self.top, keys, key=self.stats.__getitem__)
+        self.keys = self.sorted(keys)
+        self.endResetModel()
+
+    def sorted(self, keys):
+        if self.sort_column == len(self.headers) - 1:
+            stats = self.stats
+            sort_key = lambda key: stats.get(key, 0)
+        elif len(self.headers) == 2:
+            sort_key = None
+        else:
+            column = self.sort_column
+            sort_key = lambda key: key[column]
+        return sorted(keys, key=sort_key, reverse=self.sort_order == Qt.DescendingOrder)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        indexes = self.persistentIndexList()
+        keys = [self.keys[index.row()] for index in indexes]
+        self.sort_column = column
+        self.sort_order = order
+        self.keys = self.sorted(self.keys)
+        rows = {key: row for row, key in enumerate(self.keys)} if indexes else {}
+        self.changePersistentIndexList(indexes, [self.index(rows[key], index.column())
+                                                 for key, index in zip(keys, indexes)])
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        key = self.keys[index.row()]
+        if index.column() == len(self.headers) - 1:
+            # Stats are updated on edits, a key may be gone until they are collected again
+            return self.stats.get(key, 0)
+        return key[index.column()] if isinstance(key, tuple) else str(key)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
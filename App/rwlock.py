@@ -0,0 +1,99 @@
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    Readers-writer lock: any number of threads may hold it for reading, or a single thread for writing.
+    Waiting writers keep new readers out, so a stream of reads cannot starve writes.
+    It is reentrant: a thread holding it may acquire it again, and a writer may also read;
+    a reader must not try to write.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        # Thread id -> number of nested read acquisitions
+        self.readers = {}
+        self.writer = None
+        self.writes = 0
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self.cond:
+            if self.writer != me and me not in self.readers:
+                while self.writer is not None or self.waiting_writers:
+                    self.cond.wait()
+            self.readers[me] = self.readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self.cond:
+            count = self.readers.pop(me) - 1
+            if count:
+                self.readers[me] = count
+            elif not self.readers:
+                self.cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self.cond:
+            if self.writer == me:
+                self.writes += 1
+                return
+            if me in self.readers:
+                raise RuntimeError('a read lock cannot be upgraded to a write lock')
+            self.waiting_writers += 1
+            try:
+                while self.writer is not None or self.readers:
+                    self.cond.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = me
+            self.writes = 1
+
+    def release_write(self):
+        with self.cond:
+            self.writes -= 1
+            if self.writes == 0:
+                self.writer = None
+                self.cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reading(method):
+    """
+    Decorates a method to run holding the `lock` (a RWLock) of its object for reading.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writing(method):
+    """
+    Decorates a method to run holding the `lock` (a RWLock) of its object for writing.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
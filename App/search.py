@@ -0,0 +1,149 @@
+import re
+import math
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+
+# A quoted phrase or `word NEAR/k word`
+QUERY_CLAUSE = re.compile(r'"([^"]*)"|(\S+)\s+NEAR/(\d+)\s+(\S+)')
+
+
+def parse_query(query):
+    """
+    Returns (the rest of the query, [quoted phrases], [(word, k, word)] of NEAR/k clauses).
+    """
+    phrases = []
+    nears = []
+    for match in QUERY_CLAUSE.finditer(query):
+        if match.group(1) is not None:
+            phrases.append(match.group(1))
+        else:
+            nears.append((match.group(2), int(match.group(3)), match.group(4)))
+    return QUERY_CLAUSE.sub(' ', query), phrases, nears
+
+
+def term_positions(store, lower_ids):
+    """
+    Returns {text name: sorted token positions} of the words of a term.
+    """
+    store.index_words()
+    forms = [store.word_index[lower_id] for lower_id in lower_ids if lower_id in store.word_index]
+    if len(forms) == 1:
+        return forms[0]
+    merged = {}
+    for texts in forms:
+        for name, positions in texts.items():
+            merged.setdefault(name, []).append(positions)
+    return {name: lists[0] if len(lists) == 1 else sorted(chain.from_iterable(lists))
+            for name, lists in merged.items()}
+
+
+def contains(positions, position):
+    i = bisect_left(positions, position)
+    return i < len(positions) and positions[i] == position
+
+
+def phrase_hits(store, terms):
+    """
+    Returns {text name: [token positions of each hit]} of consecutive occurrences of `terms`.
+    Candidates are the positions of the rarest term in a text, the others are checked by binary search.
+    """
+    positions = [term_positions(store, lower_ids) for lower_ids in terms]
+    if not positions or not all(positions):
+        return {}
+    hits = {}
+    for name in set.intersection(*(set(texts) for texts in positions)):
+        lists = [texts[name] for texts in positions]
+        rarest = min(range(len(lists)), key=lambda i: len(lists[i]))
+        for position in lists[rarest]:
+            start = position - rarest
+            if start >= 0 and all(contains(lists[i], start + i) for i in range(len(lists)) if i != rarest):
+                hits.setdefault(name, []).append(tuple(range(start, start + len(lists))))
+    return hits
+
+
+def near_hits(store, first, second, k):
+    """
+    Returns {text name: [(position, position)]} of occurrences of terms `first` and `second`
+    at most `k` tokens apart, in any order.
+    """
+    first_positions = term_positions(store, first)
+    second_positions = term_positions(store, second)
+    hits = {}
+    for name in first_positions.keys() & second_positions.keys():
+        others = second_positions[name]
+        text_hits = set()
+        for position in first_positions[name]:
+            for i in range(bisect_left(others, position - k), bisect_right(others, position + k)):
+                if others[i] != position:
+                    text_hits.add((min(position, others[i]), max(position, others[i])))
+        if text_hits:
+            hits[name] = sorted(text_hits)
+    return hits
+
+
+class BM25:
+    """
+    Okapi BM25 ranking of the texts of a TextStore, using its positional word index as postings:
+    a query term is a set of lowercased word ids (e.g. all forms of a lemma), its frequency in a text
+    is the number of occurrences of these words and the length of a text is its number of tokens.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+    @staticmethod
+    def postings(store, lower_ids):
+        """
+        Returns [{text name: token positions}] of the words of a term that occur in the corpus.
+        """
+        store.index_words()
+        return [texts for texts in (store.word_index.get(lower_id) for lower_id in lower_ids) if texts]
+
+    def idf(self, num_texts, df):
+        return math.log(1 + (num_texts - df + 0.5) / (df + 0.5))
+
+    def top_k(self, store, terms, k=None, texts=None):
+        """
+        Returns [(text name, score)] of the `k` (all if None) best matching texts, best first,
+        only texts from `texts` are considered if it is given.
+        Terms are processed in the order of decreasing maximum score (term-at-a-time MaxScore): once
+        the remaining terms cannot lift a new text above the current k-th score, they only
+        update scores of the texts found so far.
+        """
+        num_texts = len(store)
+        if num_texts == 0:
+            return []
+        avg_len = store.num_tokens / num_texts or 1
+        weighted = []
+        for lower_ids in terms:
+            postings = self.postings(store, lower_ids)
+            if postings:
+                df = len(postings[0]) if len(postings) == 1 else len(set().union(*postings))
+                idf = self.idf(num_texts, df)
+                weighted.append((idf * (self.k1 + 1), idf, postings))
+        weighted.sort(key=lambda term: -term[0])
+
+        remaining = sum(max_score for max_score, _, _ in weighted)
+        scores = {}
+        norms = {}
+        for max_score, idf, postings in weighted:
+            if k is not None and len(scores) >= k and heapq.nlargest(k, scores.values())[-1] >= remaining:
+                names = [name for name in scores if any(name in form_texts for form_texts in postings)]
+            else:
+                names = set().union(*postings) if len(postings) > 1 else postings[0]
+            if texts is not None:
+                names = [name for name in names if name in texts]
+            for name in names:
+                norm = norms.get(name)
+                if norm is None:
+                    length = len(store.segments[store.ordinals[name]])
+                    norm = norms[name] = self.k1 * (1 - self.b + self.b * length / avg_len)
+                tf = sum(len(form_texts[name]) for form_texts in postings if name in form_texts)
+                scores[name] = scores.get(name, 0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            remaining -= max_score
+
+        ranked = sorted(scores.items(), key=lambda ns: (-ns[1], store.ordinals[ns[0]]))
+        return ranked if k is None else ranked[:k]
@@ -0,0 +1,119 @@
+import re
+
+import numpy as np
+
+
+def count_ids(ids):
+    """
+    Returns (unique ids, counts) of an id array, ordered by the first occurrence of each id.
+    """
+    uniq, first, counts = np.unique(ids, return_index=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+    return uniq[order], counts[order]
+
+
+def add_count(d, key, delta):
+    count = d.get(key, 0) + delta
+    if count:
+        d[key] = count
+    else:
+        d.pop(key, None)
+
+
+class StatsEngine:
+    """
+    Collects tag, word-tag and tag-tag frequencies from the id columns of a TextStore
+    and keeps them up to date when tokens are added, replaced or retagged.
+    Word validity is computed once per vocabulary entry and cached, since vocabulary ids never change;
+    the cache is dropped when the engine is given another vocabulary (e.g. of a newly loaded corpus).
+    """
+
+    def __init__(self, reg, tags):
+        self.reg = reg
+        self.tags = list(tags)
+        self.tag_set = set(tags)
+        # (vocabulary, validity of its first entries), replaced at once as snapshots are read concurrently
+        self.valid = (None, np.zeros(0, dtype=bool))
+
+    def is_counted(self, word, tag):
+        return tag in self.tag_set and re.fullmatch(self.reg, word) is not None
+
+    def counted_tag(self, store, index, step):
+        """
+        Returns the tag of the first counted token from global `index` in direction `step`, or None.
+        """
+        while 0 <= index < store.num_tokens:
+            _, word, tag = store.get_token(index)
+            if self.is_counted(word, tag):
+                return tag
+            index += step
+        return None
+
+    def update(self, stats, old_tokens, new_tokens, prev_tag=None, next_tag=None):
+        """
+        Updates `stats` in place after consecutive (word, tag) tokens `old_tokens` were replaced
+        by `new_tokens`; `prev_tag` and `next_tag` are tags of the counted tokens around them.
+        """
+        tag_freq, word_tag_freq, tag_tag_freq = stats
+        for tokens, sign in ((old_tokens, -1), (new_tokens, 1)):
+            tags = [prev_tag] if prev_tag else []
+            for word, tag in tokens:
+                if self.is_counted(word, tag):
+                    tag_freq[tag] += sign
+                    add_count(word_tag_freq, (word.lower(), tag), sign)
+                    tags.append(tag)
+            if next_tag:
+                tags.append(next_tag)
+            for tag_pair in zip(tags, tags[1:]):
+                add_count(tag_tag_freq, tag_pair, sign)
+
+    def get_valid_words(self, vocab, size=None):
+        """
+        Returns whether each of the first `size` (all if None) entries of `vocab` is a valid word, as a bool array.
+        """
+        if size is None:
+            size = len(vocab)
+        valid_vocab, valid = self.valid
+        if valid_vocab is not vocab:
+            valid = np.zeros(0, dtype=bool)
+        if len(valid) < size:
+            new_valid = np.fromiter((re.fullmatch(self.reg, word) is not None
+                                     for word in vocab.words[len(valid):size]),
+                                    dtype=bool, count=size - len(valid))
+            valid = np.concatenate((valid, new_valid))
+            self.valid = (vocab, valid)
+        return valid[:size]
+
+    def collect(self, store):
+        """
+        Returns (tag freq, word-tag freq, tag-tag freq) dicts counting only tokens with a valid word
+        and a tag from `tags`; words are lowercased, tag pairs are taken over consecutive counted tokens.
+        """
+        num_tags = len(self.tags)
+        tag_freq = {tag: 0 for tag in self.tags}
+        word_tag_freq = {}
+        tag_tag_freq = {}
+        if store.num_tokens == 0:
+            return tag_freq, word_tag_freq, tag_tag_freq
+
+        word_ids = np.concatenate([np.frombuffer(s.word_ids, dtype=np.uint32) for s in store.segments])
+        tag_ids = np.concatenate([np.frombuffer(s.tag_ids, dtype=np.uint8) for s in store.segments])
+        # Tags from `tags` come first in the tag vocabulary
+        size, lower_ids = store.vocab_table()
+        mask = self.get_valid_words(store.vocab, size)[word_ids] & (tag_ids < num_tags)
+        lower_ids = np.frombuffer(lower_ids, dtype=np.uint32)[word_ids[mask]].astype(np.int64)
+        tag_ids = tag_ids[mask].astype(np.int64)
+
+        for tag, count in zip(self.tags, np.bincount(tag_ids, minlength=num_tags).tolist()):
+            tag_freq[tag] = count
+
+        words = store.vocab.words
+        uniq, counts = count_ids(lower_ids * num_tags + tag_ids)
+        for packed, count in zip(uniq.tolist(), counts.tolist()):
+            word_tag_freq[(words[packed // num_tags], self.tags[packed % num_tags])] = count
+
+        if len(tag_ids) > 1:
+            uniq, counts = count_ids(tag_ids[:-1] * num_tags + tag_ids[1:])
+            for packed, count in zip(uniq.tolist(), counts.tolist()):
+                tag_tag_freq[(self.tags[packed // num_tags], self.tags[packed % num_tags])] = count
+        return tag_freq, word_tag_freq, tag_tag_freq
@@ -0,0 +1,605 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from collections.abc import Mapping, Sequence
+
+
+class Vocabulary:
+    """
+    Interned strings: id -> string and string -> id,
+    plus the id of the lowercased form of every entry if `lowercase` is set.
+    """
+
+    def __init__(self, words=(), max_size=None, lowercase=True):
+        self.words = []
+        self.ids = {}
+        self.lower_ids = array('I') if lowercase else None
+        self.max_size = max_size
+        for word in words:
+            self.add(word)
+
+    @classmethod
+    def from_table(cls, words, lower_ids=None):
+        """
+        Creates a vocabulary of `words` (ids are their positions) with precomputed `lower_ids`.
+        """
+        vocab = cls(lowercase=False)
+        vocab.words = list(words)
+        vocab.ids = {word: i for i, word in enumerate(vocab.words)}
+        vocab.lower_ids = lower_ids
+        return vocab
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word):
+        i = self.ids.get(word)
+        if i is None:
+            if self.lower_ids is not None:
+                lower = word.lower()
+                lower_id = self.add(lower) if lower != word else len(self.words)
+            i = len(self.words)
+            if self.max_size is not None and i >= self.max_size:
+                raise ValueError(f'vocabulary is limited to {self.max_size} entries')
+            # The lowercased id comes first, a word is never seen without it
+            if self.lower_ids is not None:
+                self.lower_ids.append(lower_id)
+            self.words.append(word)
+            self.ids[word] = i
+        return i
+
+    def add_all(self, words):
+        return [self.add(word) for word in words]
+
+
+class PrefixIndex:
+    """
+    Words sorted by their lowercased form, a prefix search is a binary search plus a scan of the k matches.
+    """
+
+    def __init__(self, words=()):
+        self.entries = sorted((word.lower(), word) for word in words)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, word):
+        entry = (word.lower(), word)
+        i = bisect_left(self.entries, entry)
+        if i == len(self.entries) or self.entries[i] != entry:
+            self.entries.insert(i, entry)
+
+    def remove(self, word):
+        entry = (word.lower(), word)
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def words(self):
+        return [word for _, word in self.entries]
+
+    def find(self, prefix, ignore_case=True, limit=None):
+        """
+        Returns the words starting with `prefix` in index order, at most `limit` (all if None) of them.
+        """
+        key = prefix.lower()
+        found = []
+        for i in range(bisect_left(self.entries, (key,)), len(self.entries)):
+            lower, word = self.entries[i]
+            if not lower.startswith(key):
+                break
+            if ignore_case or word.startswith(prefix):
+                found.append(word)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+
+def to_array(typecode, column):
+    if isinstance(column, array):
+        return column
+    result = array(typecode)
+    if isinstance(column, memoryview):
+        result.frombytes(column.cast('B'))
+    else:
+        result.extend(column)
+    return result
+
+
+class TextSegment:
+    """
+    Raw text of a single corpus text with its tokens stored column-wise:
+    start offsets relative to the text (int64), word ids (uint32) and tag ids (uint8).
+    Editing a text never touches the others.
+    Columns may be writable memoryviews of these types (e.g. of a mapped corpus file), they are copied
+    into arrays when the text is edited; `text` may be a callable returning the text of `length`
+    characters, it is called on first access.
+    """
+
+    __slots__ = ('_text', 'length', 'starts', 'word_ids', 'tag_ids', 'lower_ids', '_word_index')
+
+    def __init__(self, text, starts, word_ids, tag_ids, lower_ids, length=None):
+        self._text = text
+        self.length = len(text) if length is None else length
+        self.starts = starts if isinstance(starts, memoryview) else to_array('q', starts)
+        self.word_ids = word_ids if isinstance(word_ids, memoryview) else to_array('I', word_ids)
+        self.tag_ids = tag_ids if isinstance(tag_ids, memoryview) else to_array('B', tag_ids)
+        self.lower_ids = lower_ids
+        self._word_index = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def text(self):
+        if callable(self._text):
+            self._text = self._text()
+        return self._text
+
+    @property
+    def word_index(self):
+        """
+        Lowercased word id -> sorted token positions in the text, built on first use.
+        """
+        if self._word_index is None:
+            # Built aside, so that a concurrent reader never sees it half done
+            word_index = {}
+            lower_ids = self.lower_ids
+            for i, word_id in enumerate(self.word_ids):
+                lower_id = lower_ids[word_id]
+                positions = word_index.get(lower_id)
+                if positions is None:
+                    positions = word_index[lower_id] = array('I')
+                positions.append(i)
+            self._word_index = word_index
+        return self._word_index
+
+    def load(self):
+        """
+        Reads the text and copies memoryview columns into arrays, so that the segment no longer refers
+        to the buffer they came from (e.g. a mapped corpus file that is about to be closed).
+        """
+        self._text = self.text
+        self.starts = to_array('q', self.starts)
+        self.word_ids = to_array('I', self.word_ids)
+        self.tag_ids = to_array('B', self.tag_ids)
+
+    def copy(self):
+        segment = TextSegment(self._text, array('q', self.starts), array('I', self.word_ids),
+                              array('B', self.tag_ids), self.lower_ids, self.length)
+        if self._word_index is not None:
+            segment._word_index = {lower: array('I', positions) for lower, positions in self._word_index.items()}
+        return segment
+
+    def find_token(self, offset):
+        """
+        Returns the index of the last token starting at or before local `offset`.
+        """
+        return bisect_right(self.starts, offset) - 1
+
+    def replace(self, index, old_len, new_word, new_starts, new_word_ids, new_tag_ids):
+        """
+        Replaces token `index` spanning `old_len` characters with `new_word` split into new tokens
+        (starts relative to `new_word`).
+        Returns (removed lowercased word ids, added lowercased word ids) of the word index.
+        """
+        self.starts = to_array('q', self.starts)
+        self.word_ids = to_array('I', self.word_ids)
+        self.tag_ids = to_array('B', self.tag_ids)
+        lower_ids = self.lower_ids
+        start = self.starts[index]
+        delta = len(new_word) - old_len
+        self._text = self.text[:start] + new_word + self.text[start + old_len:]
+        self.length += delta
+        tokens_delta = len(new_word_ids) - 1
+        old_lower = lower_ids[self.word_ids[index]]
+
+        self.starts[index:index + 1] = array('q', [start + s for s in new_starts])
+        for i in range(index + len(new_word_ids), len(self.starts)):
+            self.starts[i] += delta
+        self.word_ids[index:index + 1] = array('I', new_word_ids)
+        self.tag_ids[index:index + 1] = array('B', new_tag_ids)
+
+        positions = self.word_index[old_lower]
+        del positions[bisect_left(positions, index)]
+        if tokens_delta != 0:
+            for positions in self.word_index.values():
+                for i in range(bisect_left(positions, index + 1), len(positions)):
+                    positions[i] += tokens_delta
+        added = set()
+        for i, word_id in enumerate(new_word_ids):
+            lower_id = lower_ids[word_id]
+            if lower_id not in self.word_index:
+                self.word_index[lower_id] = array('I')
+                added.add(lower_id)
+            positions = self.word_index[lower_id]
+            positions.insert(bisect_left(positions, index + i), index + i)
+        removed = set()
+        if not self.word_index[old_lower]:
+            del self.word_index[old_lower]
+            removed.add(old_lower)
+        return removed, added
+
+
+class TextStore:
+    """
+    Corpus raw text and tokens stored per text.
+    Texts are laid out one after another, each preceded by `sep`; global offsets of texts
+    and indices of their first tokens are kept in arrays, so an edit costs work proportional
+    to the edited text plus a shift of the following texts' entries.
+    Words and tags of tokens are interned in `vocab` and `tag_vocab` (initialized with `tags`).
+    A snapshot shares the texts with the store until they are edited, see `snapshot`.
+    """
+
+    def __init__(self, sep, tags=()):
+        self.sep = sep
+        self.vocab = Vocabulary()
+        self.tag_vocab = Vocabulary(tags, max_size=256, lowercase=False)
+        self.names = []
+        self.ordinals = {}
+        self.segments = []
+        self.offsets = array('q')
+        self.first_tokens = array('q')
+        self.num_tokens = 0
+        self.length = 0
+        # lowercased word id -> {text name: token positions in the text}, texts in corpus order;
+        # texts are merged into it on first use, `indexed` is the number of merged texts
+        self.word_index = {}
+        self.indexed = 0
+        self.index_lock = threading.Lock()
+        # Incremented on every change; ordinals of the texts shared with snapshots
+        self.version = 0
+        self.shared = set()
+        # (vocabulary size, lowercased word ids) as of the snapshot, None for the store itself
+        self.frozen_vocab = None
+
+        self.raw = RawTextView(self)
+        self.spans = TextSpansView(self)
+        self.token_ranges = TokenRangesView(self)
+        self.tokens = TokensView(self)
+
+    @classmethod
+    def from_legacy(cls, sep, raw_text, text_spans, tokenized_text, tags=()):
+        """
+        Builds the store from a single raw text string, text spans and a list of (start, word, tag).
+        """
+        store = cls(sep, tags)
+        token_starts = array('q', [s for s, _, _ in tokenized_text])
+        for text_name, (text_start, text_end) in text_spans.items():
+            first, last = bisect_left(token_starts, text_start), bisect_left(token_starts, text_end)
+            tokens = tokenized_text[first:last]
+            store.add(text_name, raw_text[text_start:text_end],
+                      [s - text_start for s, _, _ in tokens], [w for _, w, _ in tokens], [t for _, _, t in tokens])
+        return store
+
+    def __len__(self):
+        return len(self.names)
+
+    def snapshot(self):
+        """
+        Returns a read-only copy of the store that later changes of the store do not affect, e.g. for reading
+        it without holding a lock. It costs time proportional to the number of texts plus a copy of the
+        lowercased ids of the vocabulary: texts are copied only when the store edits them (copy on write),
+        vocabularies only grow and are shared, see `vocab_table`.
+        """
+        store = TextStore(self.sep)
+        store.vocab = self.vocab
+        store.tag_vocab = self.tag_vocab
+        store.names = list(self.names)
+        store.ordinals = dict(self.ordinals)
+        store.segments = list(self.segments)
+        store.offsets = array('q', self.offsets)
+        store.first_tokens = array('q', self.first_tokens)
+        store.num_tokens = self.num_tokens
+        store.length = self.length
+        store.version = self.version
+        # Lowercased ids are copied, the growing array cannot be read as a buffer while it is appended to
+        size, lower_ids = self.vocab_table()
+        store.frozen_vocab = size, lower_ids[:size]
+        self.shared = set(range(len(self.segments)))
+        store.shared = set(self.shared)
+        return store
+
+    def vocab_table(self):
+        """
+        Returns (number of vocabulary entries the texts may refer to, lowercased word ids of the entries);
+        those of a snapshot are taken with it, while the shared vocabulary keeps growing.
+        """
+        if self.frozen_vocab is not None:
+            return self.frozen_vocab
+        return len(self.vocab), self.vocab.lower_ids
+
+    def writable_segment(self, k):
+        """
+        Returns the k-th text to be edited in place, copying it first if a snapshot shares it.
+        """
+        self.version += 1
+        if k not in self.shared:
+            return self.segments[k]
+        self.shared.discard(k)
+        segment = self.segments[k] = self.segments[k].copy()
+        if k < self.indexed:
+            text_name = self.names[k]
+            for lower, positions in segment.word_index.items():
+                self.word_index[lower][text_name] = positions
+        return segment
+
+    def segment(self, text_name):
+        return self.segments[self.ordinals[text_name]]
+
+    def add(self, text_name, text, starts, words, tags):
+        segment = TextSegment(text, starts, self.vocab.add_all(words), self.tag_vocab.add_all(tags),
+                              self.vocab.lower_ids)
+        self.add_segment(text_name, segment)
+        return segment
+
+    def add_segment(self, text_name, segment):
+        """
+        Appends a text whose word and tag ids are already interned in `vocab` and `tag_vocab`.
+        """
+        self.ordinals[text_name] = len(self.names)
+        self.names.append(text_name)
+        self.segments.append(segment)
+        self.offsets.append(self.length + len(self.sep))
+        self.first_tokens.append(self.num_tokens)
+        self.length += len(self.sep) + segment.length
+        self.num_tokens += len(segment)
+        self.version += 1
+
+    def index_words(self):
+        """
+        Merges word indexes of the texts added since the last call into `word_index`.
+        Entries are replaced rather than updated, so concurrent readers of `word_index` may call it.
+        """
+        if self.indexed == len(self.names):
+            return
+        with self.index_lock:
+            added = {}
+            end = len(self.names)
+            for k in range(self.indexed, end):
+                for lower, positions in self.segments[k].word_index.items():
+                    added.setdefault(lower, {})[self.names[k]] = positions
+            for lower, texts in added.items():
+                if lower in self.word_index:
+                    merged = dict(self.word_index[lower])
+                    merged.update(texts)
+                    texts = merged
+                self.word_index[lower] = texts
+            self.indexed = end
+
+    def locate_token(self, index):
+        """
+        Returns (text ordinal, local token index) of a global token index.
+        """
+        if index < 0:
+            index += self.num_tokens
+        if not 0 <= index < self.num_tokens:
+            raise IndexError('token index out of range')
+        k = bisect_right(self.first_tokens, index) - 1
+        return k, index - self.first_tokens[k]
+
+    def get_token(self, index):
+        k, i = self.locate_token(index)
+        segment = self.segments[k]
+        return segment.starts[i] + self.offsets[k], self.vocab.words[segment.word_ids[i]], \
+            self.tag_vocab.words[segment.tag_ids[i]]
+
+    def iter_text_tokens(self, text_name, start=0, end=None):
+        """
+        Yields (start relative to the text, word, tag) of the tokens of a text,
+        only of those starting in [start, end) relative to the text if they are given.
+        """
+        segment = self.segment(text_name)
+        starts, word_ids, tag_ids = segment.starts, segment.word_ids, segment.tag_ids
+        if start or end is not None:
+            first = bisect_left(starts, start)
+            last = len(starts) if end is None else bisect_left(starts, end)
+            starts, word_ids, tag_ids = starts[first:last], word_ids[first:last], tag_ids[first:last]
+        words = self.vocab.words
+        tags = self.tag_vocab.words
+        for token_start, word_id, tag_id in zip(starts, word_ids, tag_ids):
+            yield token_start, words[word_id], tags[tag_id]
+
+    def token_at(self, text_name, offset):
+        """
+        Returns (global index, start relative to the text, word, tag) of the last token
+        of a text starting at or before `offset` relative to the text, or None.
+        """
+        k = self.ordinals[text_name]
+        segment = self.segments[k]
+        i = segment.find_token(offset)
+        if i < 0:
+            return None
+        return (self.first_tokens[k] + i, segment.starts[i], self.vocab.words[segment.word_ids[i]],
+                self.tag_vocab.words[segment.tag_ids[i]])
+
+    def find_text_tokens(self, text_name, lower_ids, positions=()):
+        """
+        Returns [(start relative to the text, word, tag)] of the tokens of a text whose lowercased
+        word ids are in `lower_ids` and of the tokens at `positions`, in text order.
+        """
+        segment = self.segment(text_name)
+        index = segment.word_index
+        positions = sorted(set(chain(positions, *(index.get(lower_id, ()) for lower_id in lower_ids))))
+        words = self.vocab.words
+        tags = self.tag_vocab.words
+        return [(segment.starts[i], words[segment.word_ids[i]], tags[segment.tag_ids[i]]) for i in positions]
+
+    def get_occurrences(self, word):
+        """
+        Returns {text name: token positions in the text} of a word, case-insensitive.
+        """
+        lower_id = self.vocab.ids.get(word.lower())
+        if lower_id is None:
+            return {}
+        self.index_words()
+        return self.word_index.get(lower_id, {})
+
+    def iter_tokens(self, first=0, last=None):
+        if last is None:
+            last = self.num_tokens
+        if first >= last:
+            return
+        k, i = self.locate_token(first)
+        index = first
+        while index < last:
+            segment = self.segments[k]
+            offset = self.offsets[k]
+            end = min(len(segment), i + last - index)
+            words = self.vocab.words
+            tags = self.tag_vocab.words
+            for j in range(i, end):
+                yield segment.starts[j] + offset, words[segment.word_ids[j]], tags[segment.tag_ids[j]]
+            index += end - i
+            k += 1
+            i = 0
+
+    def set_tag(self, index, tag):
+        k, i = self.locate_token(index)
+        self.writable_segment(k).tag_ids[i] = self.tag_vocab.add(tag)
+
+    def replace_token(self, index, new_word, new_starts, new_words, new_tags):
+        """
+        Replaces a token with `new_word` split into new tokens (starts relative to `new_word`).
+        """
+        self.index_words()
+        k, i = self.locate_token(index)
+        segment = self.writable_segment(k)
+        text_name = self.names[k]
+        old_len = len(self.vocab.words[segment.word_ids[i]])
+        delta = len(new_word) - old_len
+        tokens_delta = len(new_words) - 1
+        removed, added = segment.replace(i, old_len, new_word, new_starts, self.vocab.add_all(new_words),
+                                         self.tag_vocab.add_all(new_tags))
+
+        for j in range(k + 1, len(self.names)):
+            self.offsets[j] += delta
+            self.first_tokens[j] += tokens_delta
+        self.length += delta
+        self.num_tokens += tokens_delta
+
+        for lower in removed:
+            texts = self.word_index[lower]
+            del texts[text_name]
+            if not texts:
+                del self.word_index[lower]
+        for lower in added:
+            texts = self.word_index.setdefault(lower, {})
+            texts[text_name] = segment.word_index[lower]
+            if any(self.ordinals[name] > k for name in texts):
+                self.word_index[lower] = {name: texts[name] for name in sorted(texts, key=self.ordinals.get)}
+
+    def get_raw(self, start, end):
+        """
+        Returns the raw text between global offsets, including separators between texts.
+        """
+        start = max(start, 0)
+        end = min(end, self.length)
+        parts = []
+        sep_len = len(self.sep)
+        k = max(bisect_right(self.offsets, start + sep_len) - 1, 0)
+        while k < len(self.names) and start < end:
+            text_start = self.offsets[k]
+            segment = self.segments[k]
+            if start < text_start:
+                parts.append(self.sep[start - text_start + sep_len:min(end, text_start) - text_start + sep_len])
+                start = min(end, text_start)
+            if start < end:
+                parts.append(segment.text[start - text_start:end - text_start])
+                start = min(end, text_start + segment.length)
+            k += 1
+        return ''.join(parts)
+
+    def __str__(self):
+        return ''.join(self.sep + segment.text for segment in self.segments)
+
+
+class RawTextView:
+    """
+    Read-only string-like view of the whole raw text of a store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.store.length)
+            if step != 1:
+                return str(self.store)[key]
+            return self.store.get_raw(start, stop)
+        if key < 0:
+            key += self.store.length
+        if not 0 <= key < self.store.length:
+            raise IndexError('string index out of range')
+        return self.store.get_raw(key, key + 1)
+
+    def __str__(self):
+        return str(self.store)
+
+
+class TextSpansView(Mapping):
+    """
+    Read-only mapping: text name -> (global start, global end) of its raw text.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, text_name):
+        k = self.store.ordinals[text_name]
+        start = self.store.offsets[k]
+        return start, start + self.store.segments[k].length
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def __len__(self):
+        return len(self.store.names)
+
+
+class TokenRangesView(Mapping):
+    """
+    Read-only mapping: text name -> [first, last) global token indices of the text.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, text_name):
+        k = self.store.ordinals[text_name]
+        first = self.store.first_tokens[k]
+        return first, first + len(self.store.segments[k])
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def __len__(self):
+        return len(self.store.names)
+
+
+class TokensView(Sequence):
+    """
+    Read-only sequence of (global start, word, tag) of all tokens of a store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.num_tokens
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.store.num_tokens)
+            if step != 1:
+                return [self.store.get_token(i) for i in range(start, stop, step)]
+            return list(self.store.iter_tokens(start, stop))
+        return self.store.get_token(key)
+
+    def __iter__(self):
+        return self.store.iter_tokens()
@@ -0,0 +1,96 @@
+from PyQt5.QtCore import *
+
+
+class TaskSignals(QObject):
+    # (task, result or None if it was cancelled before it started)
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+
+
+class CorpusTask(QRunnable):
+    def __init__(self, executor, channel, generation, fn, args, on_done, on_error, lock, write):
+        super(CorpusTask, self).__init__()
+        self.setAutoDelete(False)
+        self.executor = executor
+        self.channel = channel
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.lock = lock
+        self.write = write
+
+    def run(self):
+        signals = self.executor.signals
+        if self.executor.is_cancelled(self):
+            signals.finished.emit(self, None)
+            return
+        try:
+            if self.lock is None:
+                result = self.fn(*self.args)
+            else:
+                with self.lock.write() if self.write else self.lock.read():
+                    result = self.fn(*self.args)
+        except Exception as e:
+            signals.failed.emit(self, e)
+            return
+        signals.finished.emit(self, result)
+
+
+class TaskExecutor(QObject):
+    """
+    Runs corpus operations on a thread pool, holding `lock` (a RWLock) for reading or for writing,
+    and calls their `on_done` callbacks with the results in the thread of the executor (the GUI thread),
+    or their `on_error` callbacks with the exceptions they raised.
+    Tasks of a channel (e.g. 'query') supersede each other: submitting one cancels the previous one,
+    which is taken off the queue if it has not started yet and whose result is dropped otherwise.
+    Tasks without a channel (e.g. edits) are never cancelled.
+    """
+
+    def __init__(self, max_threads=None, parent=None):
+        super(TaskExecutor, self).__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.generations = {}
+        # Tasks are kept until they finish, Qt does not own them
+        self.tasks = set()
+        self.signals = TaskSignals(self)
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None, lock=None, write=False):
+        generation = self.cancel(channel) if channel is not None else 0
+        task = CorpusTask(self, channel, generation, fn, args, on_done, on_error, lock, write)
+        self.tasks.add(task)
+        self.pool.start(task)
+        return task
+
+    def cancel(self, channel):
+        """
+        Cancels the tasks of a channel, returns the generation of the next task of the channel.
+        """
+        generation = self.generations.get(channel, 0) + 1
+        self.generations[channel] = generation
+        for task in [task for task in self.tasks if task.channel == channel]:
+            if self.pool.tryTake(task):
+                self.tasks.discard(task)
+        return generation
+
+    def is_cancelled(self, task):
+        return task.channel is not None and self.generations.get(task.channel) != task.generation
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def on_finished(self, task, result):
+        self.tasks.discard(task)
+        if task.on_done is not None and not self.is_cancelled(task):
+            task.on_done(result)
+
+    def on_failed(self, task, error):
+        self.tasks.discard(task)
+        print(error)
+        if task.on_error is not None and not self.is_cancelled(task):
+            task.on_error(error)
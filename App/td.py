@@ -6,7 +6,10 @@ from Corpus import tag_descr
 
 qtCreatorFile = "td_dialog.ui"
 
-Ui_Dialog, QtBaseClass = uic.loadUiType(qtCreatorFile)
+try:
+    from ui_td_dialog import Ui_Dialog
+except ImportError:
+    Ui_Dialog, QtBaseClass = uic.loadUiType(qtCreatorFile)
 
 
 class TagsDescriptionDialog(QDialog, Ui_Dialog):
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'app_window.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(900, 600)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(MainWindow.sizePolicy().hasHeightForWidth())
+        MainWindow.setSizePolicy(sizePolicy)
+        MainWindow.setMinimumSize(QtCore.QSize(900, 600))
+        MainWindow.setMaximumSize(QtCore.QSize(900, 600))
+        icon = QtGui.QIcon()
+        icon.addPixmap(QtGui.QPixmap(":/icon/24x24/23.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        MainWindow.setWindowIcon(icon)
+        MainWindow.setIconSize(QtCore.QSize(24, 24))
+        self.centralwidget = QtWidgets.QWidget(MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.progress_bar = QtWidgets.QProgressBar(self.centralwidget)
+        self.progress_bar.setGeometry(QtCore.QRect(10, 500, 881, 23))
+        self.progress_bar.setProperty("value", 0)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setObjectName("progress_bar")
+        self.tabs = QtWidgets.QTabWidget(self.centralwidget)
+        self.tabs.setGeometry(QtCore.QRect(280, 10, 611, 481))
+        self.tabs.setObjectName("tabs")
+        self.tab_dict = QtWidgets.QWidget()
+        self.tab_dict.setObjectName("tab_dict")
+        self.gb_word = QtWidgets.QGroupBox(self.tab_dict)
+        self.gb_word.setEnabled(False)
+        self.gb_word.setGeometry(QtCore.QRect(290, 10, 301, 431))
+        font = QtGui.QFont()
+        font.setPointSize(9)
+        self.gb_word.setFont(font)
+        self.gb_word.setAlignment(QtCore.Qt.AlignCenter)
+        self.gb_word.setObjectName("gb_word")
+        self.groupBox = QtWidgets.QGroupBox(self.gb_word)
+        self.groupBox.setGeometry(QtCore.QRect(20, 220, 181, 191))
+        font = QtGui.QFont()
+        font.setPointSize(8)
+        self.groupBox.setFont(font)
+        self.groupBox.setObjectName("groupBox")
+        self.verticalLayoutWidget = QtWidgets.QWidget(self.groupBox)
+        self.verticalLayoutWidget.setGeometry(QtCore.QRect(10, 20, 161, 161))
+        self.verticalLayoutWidget.setObjectName("verticalLayoutWidget")
+        self.verticalLayout = QtWidgets.QVBoxLayout(self.verticalLayoutWidget)
+        self.verticalLayout.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout.setSpacing(2)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setSpacing(2)
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.cb_tags = QtWidgets.QComboBox(self.verticalLayoutWidget)
+        self.cb_tags.setMaximumSize(QtCore.QSize(60, 16777215))
+        self.cb_tags.setObjectName("cb_tags")
+        self.horizontalLayout_4.addWidget(self.cb_tags)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_4.addItem(spacerItem)
+        self.pb_addtag = QtWidgets.QPushButton(self.verticalLayoutWidget)
+        self.pb_addtag.setMaximumSize(QtCore.QSize(30, 30))
+        self.pb_addtag.setToolTip("")
+        self.pb_addtag.setText("")
+        icon1 = QtGui.QIcon()
+        icon1.addPixmap(QtGui.QPixmap(":/icon/24x24/60.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_addtag.setIcon(icon1)
+        self.pb_addtag.setFlat(True)
+        self.pb_addtag.setObjectName("pb_addtag")
+        self.horizontalLayout_4.addWidget(self.pb_addtag)
+        self.pb_removetag = QtWidgets.QPushButton(self.verticalLayoutWidget)
+        self.pb_removetag.setEnabled(False)
+        self.pb_removetag.setMaximumSize(QtCore.QSize(30, 30))
+        self.pb_removetag.setToolTip("")
+        self.pb_removetag.setText("")
+        icon2 = QtGui.QIcon()
+        icon2.addPixmap(QtGui.QPixmap(":/icon/24x24/59.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_removetag.setIcon(icon2)
+        self.pb_removetag.setFlat(True)
+        self.pb_removetag.setObjectName("pb_removetag")
+        self.horizontalLayout_4.addWidget(self.pb_removetag)
+        self.verticalLayout.addLayout(self.horizontalLayout_4)
+        self.lw_tags = QtWidgets.QListWidget(self.verticalLayoutWidget)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.lw_tags.sizePolicy().hasHeightForWidth())
+        self.lw_tags.setSizePolicy(sizePolicy)
+        self.lw_tags.setMinimumSize(QtCore.QSize(100, 0))
+        self.lw_tags.setMaximumSize(QtCore.QSize(200, 16777215))
+        self.lw_tags.setProperty("isWrapping", True)
+        self.lw_tags.setObjectName("lw_tags")
+        self.verticalLayout.addWidget(self.lw_tags)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setSpacing(2)
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.label_initform = QtWidgets.QLabel(self.verticalLayoutWidget)
+        self.label_initform.setEnabled(False)
+        self.label_initform.setObjectName("label_initform")
+        self.horizontalLayout_5.addWidget(self.label_initform)
+        self.le_initform = QtWidgets.QLineEdit(self.verticalLayoutWidget)
+        self.le_initform.setEnabled(False)
+        self.le_initform.setReadOnly(True)
+        self.le_initform.setObjectName("le_initform")
+        self.horizontalLayout_5.addWidget(self.le_initform)
+        self.verticalLayout.addLayout(self.horizontalLayout_5)
+        self.groupBox_2 = QtWidgets.QGroupBox(self.gb_word)
+        self.groupBox_2.setGeometry(QtCore.QRect(10, 20, 281, 191))
+        font = QtGui.QFont()
+        font.setPointSize(8)
+        self.groupBox_2.setFont(font)
+        self.groupBox_2.setObjectName("groupBox_2")
+        self.verticalLayoutWidget_2 = QtWidgets.QWidget(self.groupBox_2)
+        self.verticalLayoutWidget_2.setGeometry(QtCore.QRect(10, 20, 261, 161))
+        self.verticalLayoutWidget_2.setObjectName("verticalLayoutWidget_2")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout(self.verticalLayoutWidget_2)
+        self.verticalLayout_2.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.tb_context = QtWidgets.QTextBrowser(self.verticalLayoutWidget_2)
+        self.tb_context.setObjectName("tb_context")
+        self.verticalLayout_2.addWidget(self.tb_context)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setSpacing(2)
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.le_editword = QtWidgets.QLineEdit(self.verticalLayoutWidget_2)
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.le_editword.setFont(font)
+        self.le_editword.setReadOnly(True)
+        self.le_editword.setObjectName("le_editword")
+        self.horizontalLayout_2.addWidget(self.le_editword)
+        self.pb_edit = QtWidgets.QPushButton(self.verticalLayoutWidget_2)
+        self.pb_edit.setMaximumSize(QtCore.QSize(70, 16777215))
+        font = QtGui.QFont()
+        font.setPointSize(9)
+        self.pb_edit.setFont(font)
+        icon3 = QtGui.QIcon()
+        icon3.addPixmap(QtGui.QPixmap(":/icon/24/office/pencil_green.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_edit.setIcon(icon3)
+        self.pb_edit.setObjectName("pb_edit")
+        self.horizontalLayout_2.addWidget(self.pb_edit)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setSpacing(2)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.pb_prev = QtWidgets.QPushButton(self.verticalLayoutWidget_2)
+        self.pb_prev.setText("")
+        icon4 = QtGui.QIcon()
+        icon4.addPixmap(QtGui.QPixmap(":/icon/24x24/56.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_prev.setIcon(icon4)
+        self.pb_prev.setObjectName("pb_prev")
+        self.horizontalLayout.addWidget(self.pb_prev)
+        self.pb_next = QtWidgets.QPushButton(self.verticalLayoutWidget_2)
+        self.pb_next.setText("")
+        icon5 = QtGui.QIcon()
+        icon5.addPixmap(QtGui.QPixmap(":/icon/24x24/57.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_next.setIcon(icon5)
+        self.pb_next.setObjectName("pb_next")
+        self.horizontalLayout.addWidget(self.pb_next)
+        self.horizontalLayout_2.addLayout(self.horizontalLayout)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_2)
+        self.verticalLayoutWidget_4 = QtWidgets.QWidget(self.tab_dict)
+        self.verticalLayoutWidget_4.setGeometry(QtCore.QRect(10, 10, 271, 431))
+        self.verticalLayoutWidget_4.setObjectName("verticalLayoutWidget_4")
+        self.verticalLayout_4 = QtWidgets.QVBoxLayout(self.verticalLayoutWidget_4)
+        self.verticalLayout_4.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout_4.setObjectName("verticalLayout_4")
+        self.le_search = QtWidgets.QLineEdit(self.verticalLayoutWidget_4)
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.le_search.setFont(font)
+        self.le_search.setText("")
+        self.le_search.setObjectName("le_search")
+        self.verticalLayout_4.addWidget(self.le_search)
+        self.tw_wordfreq = QtWidgets.QTableView(self.verticalLayoutWidget_4)
+        self.tw_wordfreq.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tw_wordfreq.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.tw_wordfreq.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tw_wordfreq.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_wordfreq.setHorizontalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_wordfreq.setSortingEnabled(True)
+        self.tw_wordfreq.setObjectName("tw_wordfreq")
+        self.tw_wordfreq.horizontalHeader().setDefaultSectionSize(110)
+        self.tw_wordfreq.horizontalHeader().setMinimumSectionSize(40)
+        self.tw_wordfreq.verticalHeader().setVisible(False)
+        self.tw_wordfreq.verticalHeader().setDefaultSectionSize(16)
+        self.tw_wordfreq.verticalHeader().setMinimumSectionSize(16)
+        self.verticalLayout_4.addWidget(self.tw_wordfreq)
+        self.tabs.addTab(self.tab_dict, "")
+        self.tab_raw = QtWidgets.QWidget()
+        self.tab_raw.setObjectName("tab_raw")
+        self.tb_raw = QtWidgets.QTextEdit(self.tab_raw)
+        self.tb_raw.setEnabled(False)
+        self.tb_raw.setGeometry(QtCore.QRect(13, 10, 581, 431))
+        self.tb_raw.setObjectName("tb_raw")
+        self.tabs.addTab(self.tab_raw, "")
+        self.tab_annotated = QtWidgets.QWidget()
+        self.tab_annotated.setObjectName("tab_annotated")
+        self.te_annotated = QtWidgets.QTextEdit(self.tab_annotated)
+        self.te_annotated.setEnabled(False)
+        self.te_annotated.setGeometry(QtCore.QRect(10, 10, 321, 431))
+        self.te_annotated.setStyleSheet("selection-color: rgba(255, 255, 255, 1);\n"
+"selection-background-color: rgba(0, 0, 0, 1);")
+        self.te_annotated.setReadOnly(True)
+        self.te_annotated.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+        self.te_annotated.setObjectName("te_annotated")
+        self.gridLayoutWidget_2 = QtWidgets.QWidget(self.tab_annotated)
+        self.gridLayoutWidget_2.setGeometry(QtCore.QRect(340, 70, 261, 371))
+        self.gridLayoutWidget_2.setObjectName("gridLayoutWidget_2")
+        self.grid_legend = QtWidgets.QGridLayout(self.gridLayoutWidget_2)
+        self.grid_legend.setContentsMargins(0, 0, 0, 0)
+        self.grid_legend.setObjectName("grid_legend")
+        self.verticalLayoutWidget_3 = QtWidgets.QWidget(self.tab_annotated)
+        self.verticalLayoutWidget_3.setGeometry(QtCore.QRect(340, 10, 261, 61))
+        self.verticalLayoutWidget_3.setObjectName("verticalLayoutWidget_3")
+        self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.verticalLayoutWidget_3)
+        self.verticalLayout_3.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout_3.setSpacing(2)
+        self.verticalLayout_3.setObjectName("verticalLayout_3")
+        self.label = QtWidgets.QLabel(self.verticalLayoutWidget_3)
+        self.label.setObjectName("label")
+        self.verticalLayout_3.addWidget(self.label)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_6.setSpacing(2)
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.le_annotated = QtWidgets.QLineEdit(self.verticalLayoutWidget_3)
+        self.le_annotated.setEnabled(False)
+        self.le_annotated.setMinimumSize(QtCore.QSize(0, 30))
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.le_annotated.setFont(font)
+        self.le_annotated.setReadOnly(False)
+        self.le_annotated.setObjectName("le_annotated")
+        self.horizontalLayout_6.addWidget(self.le_annotated)
+        self.cb_annotated = QtWidgets.QComboBox(self.verticalLayoutWidget_3)
+        self.cb_annotated.setEnabled(False)
+        self.cb_annotated.setMinimumSize(QtCore.QSize(0, 30))
+        font = QtGui.QFont()
+        font.setPointSize(8)
+        self.cb_annotated.setFont(font)
+        self.cb_annotated.setObjectName("cb_annotated")
+        self.horizontalLayout_6.addWidget(self.cb_annotated)
+        self.pb_edit_annot = QtWidgets.QPushButton(self.verticalLayoutWidget_3)
+        self.pb_edit_annot.setEnabled(False)
+        self.pb_edit_annot.setMinimumSize(QtCore.QSize(30, 30))
+        self.pb_edit_annot.setMaximumSize(QtCore.QSize(30, 30))
+        self.pb_edit_annot.setText("")
+        icon6 = QtGui.QIcon()
+        icon6.addPixmap(QtGui.QPixmap(":/icon/24x24/69.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_edit_annot.setIcon(icon6)
+        self.pb_edit_annot.setObjectName("pb_edit_annot")
+        self.horizontalLayout_6.addWidget(self.pb_edit_annot)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_6)
+        self.tabs.addTab(self.tab_annotated, "")
+        self.tab_stats = QtWidgets.QWidget()
+        self.tab_stats.setObjectName("tab_stats")
+        self.tw_stat_t = QtWidgets.QTableView(self.tab_stats)
+        self.tw_stat_t.setGeometry(QtCore.QRect(10, 10, 281, 211))
+        self.tw_stat_t.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tw_stat_t.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tw_stat_t.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_stat_t.setHorizontalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_stat_t.setSortingEnabled(True)
+        self.tw_stat_t.setObjectName("tw_stat_t")
+        self.tw_stat_t.horizontalHeader().setDefaultSectionSize(80)
+        self.tw_stat_t.horizontalHeader().setMinimumSectionSize(80)
+        self.tw_stat_t.verticalHeader().setVisible(False)
+        self.tw_stat_wt = QtWidgets.QTableView(self.tab_stats)
+        self.tw_stat_wt.setGeometry(QtCore.QRect(310, 40, 281, 401))
+        self.tw_stat_wt.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tw_stat_wt.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tw_stat_wt.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_stat_wt.setHorizontalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_stat_wt.setSortingEnabled(True)
+        self.tw_stat_wt.setObjectName("tw_stat_wt")
+        self.tw_stat_wt.horizontalHeader().setDefaultSectionSize(80)
+        self.tw_stat_wt.horizontalHeader().setMinimumSectionSize(50)
+        self.tw_stat_wt.verticalHeader().setVisible(False)
+        self.tw_stat_tt = QtWidgets.QTableView(self.tab_stats)
+        self.tw_stat_tt.setGeometry(QtCore.QRect(10, 230, 281, 211))
+        self.tw_stat_tt.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tw_stat_tt.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tw_stat_tt.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_stat_tt.setHorizontalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_stat_tt.setSortingEnabled(True)
+        self.tw_stat_tt.setObjectName("tw_stat_tt")
+        self.tw_stat_tt.horizontalHeader().setDefaultSectionSize(80)
+        self.tw_stat_tt.horizontalHeader().setMinimumSectionSize(50)
+        self.tw_stat_tt.verticalHeader().setVisible(False)
+        self.label_stat_top = QtWidgets.QLabel(self.tab_stats)
+        self.label_stat_top.setGeometry(QtCore.QRect(310, 10, 31, 22))
+        self.label_stat_top.setObjectName("label_stat_top")
+        self.sb_stat_top = QtWidgets.QSpinBox(self.tab_stats)
+        self.sb_stat_top.setGeometry(QtCore.QRect(341, 10, 100, 22))
+        self.sb_stat_top.setMaximum(99999999)
+        self.sb_stat_top.setSingleStep(100)
+        self.sb_stat_top.setObjectName("sb_stat_top")
+        self.label_stat_min = QtWidgets.QLabel(self.tab_stats)
+        self.label_stat_min.setGeometry(QtCore.QRect(451, 10, 60, 22))
+        self.label_stat_min.setObjectName("label_stat_min")
+        self.sb_stat_min = QtWidgets.QSpinBox(self.tab_stats)
+        self.sb_stat_min.setGeometry(QtCore.QRect(511, 10, 80, 22))
+        self.sb_stat_min.setMinimum(1)
+        self.sb_stat_min.setMaximum(99999999)
+        self.sb_stat_min.setObjectName("sb_stat_min")
+        self.tabs.addTab(self.tab_stats, "")
+        self.label_progress = QtWidgets.QLabel(self.centralwidget)
+        self.label_progress.setGeometry(QtCore.QRect(10, 500, 871, 21))
+        font = QtGui.QFont()
+        font.setItalic(True)
+        self.label_progress.setFont(font)
+        self.label_progress.setAlignment(QtCore.Qt.AlignCenter)
+        self.label_progress.setObjectName("label_progress")
+        self.groupBox_3 = QtWidgets.QGroupBox(self.centralwidget)
+        self.groupBox_3.setGeometry(QtCore.QRect(10, 10, 261, 481))
+        font = QtGui.QFont()
+        font.setPointSize(9)
+        self.groupBox_3.setFont(font)
+        self.groupBox_3.setObjectName("groupBox_3")
+        self.verticalLayoutWidget_5 = QtWidgets.QWidget(self.groupBox_3)
+        self.verticalLayoutWidget_5.setGeometry(QtCore.QRect(10, 20, 241, 451))
+        self.verticalLayoutWidget_5.setObjectName("verticalLayoutWidget_5")
+        self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.verticalLayoutWidget_5)
+        self.verticalLayout_5.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout_5.setObjectName("verticalLayout_5")
+        self.horizontalLayout_7 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_7.setSpacing(2)
+        self.horizontalLayout_7.setObjectName("horizontalLayout_7")
+        self.le_query = QtWidgets.QLineEdit(self.verticalLayoutWidget_5)
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.le_query.setFont(font)
+        self.le_query.setObjectName("le_query")
+        self.horizontalLayout_7.addWidget(self.le_query)
+        self.pb_query = QtWidgets.QPushButton(self.verticalLayoutWidget_5)
+        self.pb_query.setMaximumSize(QtCore.QSize(80, 16777215))
+        icon7 = QtGui.QIcon()
+        icon7.addPixmap(QtGui.QPixmap(":/icon/24x24/84.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.pb_query.setIcon(icon7)
+        self.pb_query.setDefault(True)
+        self.pb_query.setObjectName("pb_query")
+        self.horizontalLayout_7.addWidget(self.pb_query)
+        self.verticalLayout_5.addLayout(self.horizontalLayout_7)
+        self.lw_raw = QtWidgets.QListWidget(self.verticalLayoutWidget_5)
+        self.lw_raw.setObjectName("lw_raw")
+        self.verticalLayout_5.addWidget(self.lw_raw)
+        MainWindow.setCentralWidget(self.centralwidget)
+        self.menubar = QtWidgets.QMenuBar(MainWindow)
+        self.menubar.setGeometry(QtCore.QRect(0, 0, 900, 26))
+        self.menubar.setObjectName("menubar")
+        self.menuFile = QtWidgets.QMenu(self.menubar)
+        self.menuFile.setObjectName("menuFile")
+        self.menuEdit = QtWidgets.QMenu(self.menubar)
+        self.menuEdit.setObjectName("menuEdit")
+        self.menuHelp = QtWidgets.QMenu(self.menubar)
+        self.menuHelp.setObjectName("menuHelp")
+        MainWindow.setMenuBar(self.menubar)
+        self.toolBar = QtWidgets.QToolBar(MainWindow)
+        self.toolBar.setMovable(False)
+        self.toolBar.setObjectName("toolBar")
+        MainWindow.addToolBar(QtCore.Qt.TopToolBarArea, self.toolBar)
+        self.action_add = QtWidgets.QAction(MainWindow)
+        icon8 = QtGui.QIcon()
+        icon8.addPixmap(QtGui.QPixmap(":/icon/24x24/2.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.action_add.setIcon(icon8)
+        self.action_add.setObjectName("action_add")
+        self.action_save = QtWidgets.QAction(MainWindow)
+        icon9 = QtGui.QIcon()
+        icon9.addPixmap(QtGui.QPixmap(":/icon/24x24/22.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.action_save.setIcon(icon9)
+        self.action_save.setObjectName("action_save")
+        self.action_load = QtWidgets.QAction(MainWindow)
+        icon10 = QtGui.QIcon()
+        icon10.addPixmap(QtGui.QPixmap(":/icon/24x24/52.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.action_load.setIcon(icon10)
+        self.action_load.setObjectName("action_load")
+        self.action_td = QtWidgets.QAction(MainWindow)
+        icon11 = QtGui.QIcon()
+        icon11.addPixmap(QtGui.QPixmap(":/icon/24x24/3.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.action_td.setIcon(icon11)
+        self.action_td.setObjectName("action_td")
+        self.action_collect = QtWidgets.QAction(MainWindow)
+        icon12 = QtGui.QIcon()
+        icon12.addPixmap(QtGui.QPixmap(":/icon/24x24/11.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.action_collect.setIcon(icon12)
+        self.action_collect.setObjectName("action_collect")
+        self.action_annotate = QtWidgets.QAction(MainWindow)
+        self.action_annotate.setEnabled(False)
+        icon13 = QtGui.QIcon()
+        icon13.addPixmap(QtGui.QPixmap(":/icon/24x24/96.png"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.action_annotate.setIcon(icon13)
+        self.action_annotate.setObjectName("action_annotate")
+        self.menuFile.addAction(self.action_add)
+        self.menuFile.addAction(self.action_save)
+        self.menuFile.addAction(self.action_load)
+        self.menuEdit.addAction(self.action_annotate)
+        self.menuEdit.addAction(self.action_collect)
+        self.menuHelp.addAction(self.action_td)
+        self.menubar.addAction(self.menuFile.menuAction())
+        self.menubar.addAction(self.menuEdit.menuAction())
+        self.menubar.addAction(self.menuHelp.menuAction())
+        self.toolBar.addAction(self.action_add)
+        self.toolBar.addAction(self.action_load)
+        self.toolBar.addAction(self.action_save)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.action_annotate)
+        self.toolBar.addAction(self.action_collect)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.action_td)
+
+        self.retranslateUi(MainWindow)
+        self.tabs.setCurrentIndex(0)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+    def retranslateUi(self, MainWindow):
+        _translate = QtCore.QCoreApplication.translate
+        MainWindow.setWindowTitle(_translate("MainWindow", "Smart Text Processor"))
+        self.gb_word.setTitle(_translate("MainWindow", "Word tools"))
+        self.groupBox.setTitle(_translate("MainWindow", "Tags"))
+        self.label_initform.setText(_translate("MainWindow", "Initial form:"))
+        self.groupBox_2.setTitle(_translate("MainWindow", "Context"))
+        self.pb_edit.setText(_translate("MainWindow", "Edit"))
+        self.le_search.setPlaceholderText(_translate("MainWindow", "Type here to search"))
+        self.tabs.setTabText(self.tabs.indexOf(self.tab_dict), _translate("MainWindow", "Dictionary"))
+        self.tabs.setTabText(self.tabs.indexOf(self.tab_raw), _translate("MainWindow", "Raw Text"))
+        self.label.setText(_translate("MainWindow", "Selected word:"))
+        self.tabs.setTabText(self.tabs.indexOf(self.tab_annotated), _translate("MainWindow", "Annotated Text"))
+        self.label_stat_top.setText(_translate("MainWindow", "Top:"))
+        self.sb_stat_top.setSpecialValueText(_translate("MainWindow", "All"))
+        self.label_stat_min.setText(_translate("MainWindow", "Min. freq.:"))
+        self.tabs.setTabText(self.tabs.indexOf(self.tab_stats), _translate("MainWindow", "Stats"))
+        self.label_progress.setText(_translate("MainWindow", "Ready"))
+        self.groupBox_3.setTitle(_translate("MainWindow", "Corpus Texts"))
+        self.le_query.setPlaceholderText(_translate("MainWindow", "Type keywords here"))
+        self.pb_query.setText(_translate("MainWindow", "Query"))
+        self.menuFile.setTitle(_translate("MainWindow", "File"))
+        self.menuEdit.setTitle(_translate("MainWindow", "Text"))
+        self.menuHelp.setTitle(_translate("MainWindow", "Help"))
+        self.toolBar.setWindowTitle(_translate("MainWindow", "toolBar"))
+        self.action_add.setText(_translate("MainWindow", "Add texts"))
+        self.action_save.setText(_translate("MainWindow", "Save corpus"))
+        self.action_load.setText(_translate("MainWindow", "Load corpus"))
+        self.action_td.setText(_translate("MainWindow", "Tags definitions"))
+        self.action_collect.setText(_translate("MainWindow", "Collect stats"))
+        self.action_annotate.setText(_translate("MainWindow", "Annotate"))
+import App_rc
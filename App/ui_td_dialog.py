@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'td_dialog.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(400, 300)
+        Dialog.setMinimumSize(QtCore.QSize(400, 300))
+        Dialog.setMaximumSize(QtCore.QSize(600, 300))
+        self.tw_tags = QtWidgets.QTableWidget(Dialog)
+        self.tw_tags.setGeometry(QtCore.QRect(10, 10, 381, 281))
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.tw_tags.sizePolicy().hasHeightForWidth())
+        self.tw_tags.setSizePolicy(sizePolicy)
+        self.tw_tags.setMinimumSize(QtCore.QSize(200, 200))
+        self.tw_tags.setMaximumSize(QtCore.QSize(600, 600))
+        self.tw_tags.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tw_tags.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_tags.setHorizontalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.tw_tags.setObjectName("tw_tags")
+        self.tw_tags.setColumnCount(2)
+        self.tw_tags.setRowCount(0)
+        item = QtWidgets.QTableWidgetItem()
+        font = QtGui.QFont()
+        font.setBold(True)
+        font.setWeight(75)
+        item.setFont(font)
+        self.tw_tags.setHorizontalHeaderItem(0, item)
+        item = QtWidgets.QTableWidgetItem()
+        font = QtGui.QFont()
+        font.setBold(True)
+        font.setWeight(75)
+        item.setFont(font)
+        self.tw_tags.setHorizontalHeaderItem(1, item)
+
+        self.retranslateUi(Dialog)
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "Tags Definitions"))
+        self.tw_tags.setSortingEnabled(True)
+        item = self.tw_tags.horizontalHeaderItem(0)
+        item.setText(_translate("Dialog", "Tag"))
+        item = self.tw_tags.horizontalHeaderItem(1)
+        item.setText(_translate("Dialog", "Definition"))